@@ -1,9 +1,9 @@
 # app.py
 # -*- coding: utf-8 -*-
-import io, math, json, re
+import io, json, re
+import numpy as np
 import pandas as pd
 import streamlit as st
-from datetime import datetime, timedelta, time
 
 # =========================
 # Page config
@@ -20,44 +20,39 @@ EXPECTED_HEB_WORDS = {
     "אין","דיווח","נוכחות","מחלה","חג","ערב","עבודה","מנוחה","יום"
 }
 
-def hebrew_only(s: str) -> bool:
-    return isinstance(s, str) and bool(HEB_ONLY.match(s.strip())) and any('\u0590' <= ch <= '\u05FF' for ch in s)
+EXPECTED_HEB_RE = re.compile("|".join(map(re.escape, sorted(EXPECTED_HEB_WORDS, key=len, reverse=True))))
 
-def reverse_hebrew_if_needed(s: str) -> str:
-    """היפוך פשוט – יופעל רק עבור טקסט עברי "טהור" כשנחליט שצריך."""
-    if hebrew_only(s):
-        return s[::-1]
-    return s
+def reverse_hebrew_if_needed(series: pd.Series) -> pd.Series:
+    """היפוך פשוט – רק לתאי טקסט עברי "טהור" (מסכה וקטורית, בלי apply לכל תא)."""
+    try:
+        stripped = series.str.strip()
+    except AttributeError:  # אין בעמודה מחרוזות בכלל
+        return series
+    is_heb = stripped.str.match(HEB_ONLY, na=False) & stripped.str.contains("[\u0590-\u05FF]", na=False)
+    return series.mask(is_heb, series.str[::-1]) if is_heb.any() else series
 
 def detect_column_orientation(series: pd.Series) -> str:
-    normal_hits = 0
-    reversed_hits = 0
-    sample = (x for x in series.dropna().astype(str).head(200))
-    for s in sample:
-        s_stripped = s.strip()
-        if not s_stripped:
-            continue
-        s_rev = s_stripped[::-1]
-        for w in EXPECTED_HEB_WORDS:
-            if w in s_stripped:
-                normal_hits += 1
-            if w in s_rev:
-                reversed_hits += 1
+    sample = series.dropna().astype(str).head(200).str.strip()
+    normal_hits = int(sample.str.count(EXPECTED_HEB_RE).sum())
+    reversed_hits = int(sample.str[::-1].str.count(EXPECTED_HEB_RE).sum())
     return "reversed" if reversed_hits > normal_hits + 1 else "normal"
 
 def apply_hebrew_correction(df: pd.DataFrame, mode: str = "auto") -> pd.DataFrame:
-    df2 = df.copy()
-    obj_cols = [c for c in df2.columns if df2[c].dtype == object]
+    """מתקן במקום (ללא העתקה) רק את העמודות שדורשות היפוך ומחזיר את אותו df."""
     if mode == "off":
-        return df2
+        return df
+    obj_cols = [c for c in df.columns if df[c].dtype == object]
     for c in obj_cols:
         if mode == "on":
-            df2[c] = df2[c].apply(reverse_hebrew_if_needed)
+            df[c] = reverse_hebrew_if_needed(df[c])
         else:  # auto
-            orient = detect_column_orientation(df2[c])
+            # דגימה מהירה: אם אף אחד מ-20 התאים הראשונים אינו עברית "טהורה" – אין מה להפוך
+            if not df[c].dropna().astype(str).head(20).str.strip().str.match(HEB_ONLY).any():
+                continue
+            orient = detect_column_orientation(df[c])
             if orient == "reversed":
-                df2[c] = df2[c].apply(reverse_hebrew_if_needed)
-    return df2
+                df[c] = reverse_hebrew_if_needed(df[c])
+    return df
 
 # =========================
 # Theme (force dark)
@@ -84,7 +79,10 @@ else:
     TABLE_BORDER = "#EEF2F7"
     LINK_HOVER = "#7C3AED"
 
-st.markdown(f"""
+@st.cache_resource
+def theme_css() -> str:
+    """בלוק ה-CSS נבנה פעם אחת לתהליך. חייבים לשלוח אותו בכל ריצה – Streamlit מסיר אלמנטים שלא נשלחו מחדש."""
+    return f"""
 <style>
 html, body, [class*="css"] {{
   direction: rtl;
@@ -134,30 +132,54 @@ h2 {{ color: {INK_SOFT}; }}
 .small {{ font-size:.9rem; color:{MUTED}; }}
 hr {{ border-top:1px solid {BORDER}; }}
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(theme_css(), unsafe_allow_html=True)
 
 # =========================
 # Utilities
 # =========================
-def parse_hhmm(s):
-    if s is None: return None
-    if isinstance(s, float) and math.isnan(s): return None
-    s = str(s).strip()
-    if not s or s in {".","-"}: return None
-    try: return datetime.strptime(s, "%H:%M").time()
-    except: return None
-
-def parse_date(s): return datetime.strptime(str(s), "%d/%m/%Y").date()
-def overlap_minutes(a_start,a_end,b_start,b_end):
-    start=max(a_start,b_start); end=min(a_end,b_end)
-    return max(0,int((end-start).total_seconds()//60))
-def daily_interval(date_obj,t_start,t_end):
-    start=datetime.combine(date_obj,t_start); end=datetime.combine(date_obj,t_end)
-    if t_end<=t_start: end+=timedelta(days=1)
-    return start,end
-def minutes_to_hours(m): return m/60.0
+# חלונות התוספות כדקות שלמות. מחזור יומי: ערב 16:00–24:00, לילה 00:00–07:30.
+# מחזור שבועי מ-1970-01-01 (יום חמישי): סופ"ש משישי 16:00 עד ראשון 07:30.
+DAY_MIN, WEEK_MIN = 1440, 7*1440
+EVE_START, EVE_LEN = 16*60, 8*60
+NIGHT_START, NIGHT_LEN = 0, 7*60+30
+WEEKEND_START, WEEKEND_LEN = DAY_MIN+16*60, 39*60+30
+
+def periodic_overlap(s,e,offset,length,period):
+    """חפיפה (בדקות) בין [s,e) לחלונות [period*k+offset, +length) (offset+length<=period).
+    הפרש של "דקות חלון מצטברות עד x" – עובד גם על מערכי משמרות שלמים, בלי לולאה."""
+    def windowed_upto(x): return (x//period)*length + np.clip(x%period-offset,0,length)
+    return windowed_upto(e)-windowed_upto(s)
+
+def allocate_weekly_topup(hours, week_codes, week_totals, threshold, rate):
+    """מחלק את העודף מעל הסף השבועי לימים הראשונים של כל שבוע (מערכים ממוינים לפי שבוע ותאריך).
+    week_totals – סך השעות של כל שבוע לפי סדרו, מחושב בחוץ כמו .sum() של pandas (לא סכום רץ)."""
+    topup=np.zeros_like(hours); n=len(hours); i=0; w=0
+    while i<n:
+        j=i
+        while j<n and week_codes[j]==week_codes[i]: j+=1
+        remain=max(0.0,week_totals[w]-threshold)
+        for k in range(i,j):
+            if remain<=0: break
+            take=min(hours[k],remain); topup[k]=take*rate; remain-=take
+        i=j; w+=1
+    return topup
+
+# ערכי "ריק" בעמודות התאריך/היום של הדוח (שורה שנייה של אותו יום)
+NA_TOKENS = ["None", "nan", "NaN", "", "."]
+
+def blank_ffill(sub: pd.DataFrame) -> pd.DataFrame:
+    """strip לכל העמודות, NA_TOKENS -> NA ומילוי קדימה – במסכה אחת על כל הבלוק."""
+    sub = sub.astype(str).apply(lambda c: c.str.strip())
+    return sub.mask(sub.isin(NA_TOKENS), pd.NA).ffill()
+
 def money(v): return f"{v:,.2f} ₪".replace(",", ",")
 
+def read_csv_bytes(raw: bytes, encoding: str = "utf-8") -> pd.DataFrame:
+    """CSV כעמודות טקסט, בלי הסקת טיפוסים (המעבד ממילא עובד על מחרוזות)."""
+    return pd.read_csv(io.BytesIO(raw), encoding=encoding, dtype=str)
+
 # =========================
 # Defaults / Params
 # =========================
@@ -193,9 +215,10 @@ def build_processor(params):
     OT_BASIS=params.get("OT_BASIS","Daily + Weekly (max)")
     WEEK_START=params.get("WEEK_START","Sunday")
 
-    def is_holiday(t): return isinstance(t,str) and any(h in t for h in HOLIDAY_HINTS)
-    def is_sick(t):    return isinstance(t,str) and (SICK_KEYWORD in t)
-    def is_no_att(t):  return isinstance(t,str) and (NO_ATTENDANCE_KEYWORD in t)
+    # מילות הסטטוס מקומפלות פעם אחת (רשימת רמזי חג ריקה = תבנית שלא מתאימה לכלום)
+    holiday_re=re.compile("|".join(map(re.escape, HOLIDAY_HINTS)) if HOLIDAY_HINTS else r"(?!)")
+    sick_re=re.compile(re.escape(SICK_KEYWORD))
+    no_att_re=re.compile(re.escape(NO_ATTENDANCE_KEYWORD))
 
     # -------- FIX 1: forward-fill date/day for split shifts --------
     def load_attendance_from_csv(csv_df: pd.DataFrame) -> pd.DataFrame:
@@ -203,189 +226,166 @@ def build_processor(params):
         for c in required:
             if c not in csv_df.columns:
                 raise ValueError(f"עמודה חסרה בקובץ: {c}")
-        df = csv_df.copy()
-
-        # ניקוי ערכים ריקים/מיותרים בעמודות התאריך והיום
-        for col in ["תאריך", "יום בשבוע"]:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip()
-                df[col] = df[col].replace({"None": pd.NA, "nan": pd.NA, "NaN": pd.NA, "": pd.NA, ".": pd.NA})
+        df = csv_df.astype(str)  # העתק יחיד בכניסה; משלב זה כל השלבים עובדים על df במקום
 
+        # ניקוי ערכים ריקים/מיותרים בעמודות התאריך והיום, ו-
         # >>> כאן הקסם: מילוי קדימה כדי ששורה שנייה של אותה משמרת תקבל את התאריך/יום שלמעלה
-        df[["תאריך", "יום בשבוע"]] = df[["תאריך", "יום בשבוע"]].ffill()
+        df[["תאריך", "יום בשבוע"]] = blank_ffill(df[["תאריך", "יום בשבוע"]]).astype(str)
 
-        return df.astype(str)
+        # ערכים חוזרים (ימים/סטטוסים) כקטגוריות – פעולות .str רצות פעם אחת לכל קטגוריה
+        df["יום בשבוע"] = df["יום בשבוע"].astype("category")
+        df["סטטוס/הערות"] = df["סטטוס/הערות"].str.strip().astype("category")
+        return df
 
     # ---------------- time buckets ----------------
-    def compute_evening_minutes(start_dt,end_dt):
-        total=0; cur=start_dt
-        while cur<end_dt:
-            day=cur.date(); eve_start,eve_end=daily_interval(day,time(16,0),time(0,0))
-            total+=overlap_minutes(start_dt,end_dt,eve_start,eve_end)
-            cur=datetime.combine(day,time(0,0))+timedelta(days=1)
-        return total
-
-    def compute_night_minutes(start_dt,end_dt):
-        total=0; cur=start_dt
-        while cur<end_dt:
-            day=cur.date(); night_start=datetime.combine(day,time(0,0)); night_end=datetime.combine(day,time(7,30))
-            total+=overlap_minutes(start_dt,end_dt,night_start,night_end)
-            cur=datetime.combine(day,time(0,0))+timedelta(days=1)
-        return total
-
-    def iter_weekend_windows(around_start,around_end):
-        window_start=(around_start - timedelta(days=3)).date()
-        window_end=(around_end + timedelta(days=3)).date()
-        d=window_start
-        while d<=window_end:
-            off=(4 - d.weekday())%7  # Fri=4
-            fri=d+timedelta(days=off)
-            fri_16=datetime.combine(fri,time(16,0))
-            sun=fri+timedelta(days=2); sun_0730=datetime.combine(sun,time(7,30))
-            yield fri_16,sun_0730
-            d+=timedelta(days=7)
-
-    def compute_weekend_minutes(start_dt,end_dt):
-        total=0
-        for w_start,w_end in iter_weekend_windows(start_dt,end_dt):
-            total+=overlap_minutes(start_dt,end_dt,w_start,w_end)
-        return total
+    # זמנים בדקות מ-1970-01-01 00:00 (ראו חלונות ה-*_START/*_LEN למעלה)
+    epoch=pd.Timestamp(0); minute=pd.Timedelta(minutes=1)
+    def compute_evening_minutes(s_min,e_min): return periodic_overlap(s_min,e_min,EVE_START,EVE_LEN,DAY_MIN)
+    def compute_night_minutes(s_min,e_min):   return periodic_overlap(s_min,e_min,NIGHT_START,NIGHT_LEN,DAY_MIN)
+    def compute_weekend_minutes(s_min,e_min): return periodic_overlap(s_min,e_min,WEEKEND_START,WEEKEND_LEN,WEEK_MIN)
+
+    def hhmm_offset(col: pd.Series) -> pd.Series:
+        """"HH:MM" -> Timedelta מתחילת היום (NaT אם לא תקין), בלי לבנות datetime רק כדי לזרוק את התאריך."""
+        hm=col.astype(str).str.strip().str.extract(r"^([0-9]{1,2}):([0-9]{1,2})$").astype(np.float64)
+        return pd.to_timedelta((hm[0]*60+hm[1]).where((hm[0]<24)&(hm[1]<60)), unit="min")
 
     def compute_daily_rows(selected_df: pd.DataFrame):
-        rows=[]
-        for _,r in selected_df.iterrows():
-            status=str(r.get("סטטוס/הערות","") or "").strip()
-            if is_no_att(status): continue
-            try: date=parse_date(str(r["תאריך"]))
-            except: continue
-            t_in=parse_hhmm(r.get("שעת כניסה"))
-            t_out=parse_hhmm(r.get("שעת יציאה"))
-            holiday_flag=is_holiday(status); sick_flag=is_sick(status)
-            if sick_flag:
-                rows.append({"תאריך":date,"סטטוס/הערות":status,"is_sick":True,"holiday":holiday_flag,
-                             "start":None,"end":None,"minutes_total":0,"minutes_evening":0,"minutes_night":0,
-                             "minutes_weekend":0,"minutes_holiday":0,"worked_day":False})
-                continue
-            if not t_in or not t_out: continue
-            start=datetime.combine(date,t_in); end=datetime.combine(date,t_out)
-            if end<=start: end+=timedelta(days=1)
-            minutes_total=int((end-start).total_seconds()//60)
-            if minutes_total<=0: continue
-            minutes_evening=compute_evening_minutes(start,end)
-            minutes_night=compute_night_minutes(start,end)
-            minutes_weekend=compute_weekend_minutes(start,end)
-            minutes_holiday=minutes_total if holiday_flag else 0
-            rows.append({"תאריך":date,"סטטוס/הערות":status,"is_sick":False,"holiday":holiday_flag,
-                        "start":start,"end":end,"minutes_total":minutes_total,"minutes_evening":minutes_evening,
-                        "minutes_night":minutes_night,"minutes_weekend":minutes_weekend,"minutes_holiday":minutes_holiday,
-                        "worked_day":True})
-        return pd.DataFrame(rows).sort_values("תאריך").reset_index(drop=True)
+        # סטטוסים, תאריכים ושעות – בפעולות עמודה אחת לכל הטבלה (ללא iterrows)
+        status=selected_df["סטטוס/הערות"]  # קטגוריאלי ומנוקה כבר ב-load_attendance_from_csv
+        no_att=status.str.contains(no_att_re)
+        sick=status.str.contains(sick_re)
+        holiday=status.str.contains(holiday_re)
+        date=pd.to_datetime(selected_df["תאריך"].astype(str).str.strip(), format="%d/%m/%Y", errors="coerce")
+        t_in=hhmm_offset(selected_df["שעת כניסה"])
+        t_out=hhmm_offset(selected_df["שעת יציאה"])
+
+        valid=date.notna() & ~no_att
+        sick_row=valid & sick
+        worked=valid & ~sick & t_in.notna() & t_out.notna()
+
+        start=(date + t_in).where(worked)
+        end=(date + t_out).where(worked)
+        end=end.mask(end<=start, end + pd.Timedelta(days=1))  # חציית חצות
+        minutes_total=((end-start).dt.total_seconds()//60).fillna(0).astype("int64")
+
+        minutes_evening=pd.Series(0, index=status.index, dtype="int64")
+        minutes_night=minutes_evening.copy(); minutes_weekend=minutes_evening.copy()
+        s_min=((start[worked]-epoch)//minute).to_numpy(np.int64)
+        e_min=((end[worked]-epoch)//minute).to_numpy(np.int64)
+        minutes_evening[worked]=compute_evening_minutes(s_min,e_min)
+        minutes_night[worked]=compute_night_minutes(s_min,e_min)
+        minutes_weekend[worked]=compute_weekend_minutes(s_min,e_min)
+
+        keep=sick_row | worked
+        out=pd.DataFrame({
+            "תאריך":date.dt.date,"סטטוס/הערות":status,"is_sick":sick_row,"holiday":holiday,
+            "start":start,"end":end,"minutes_total":minutes_total,"minutes_evening":minutes_evening,
+            "minutes_night":minutes_night,"minutes_weekend":minutes_weekend,
+            "minutes_holiday":minutes_total.where(holiday,0),"worked_day":worked,
+        })[keep]
+        return out.sort_values("תאריך").reset_index(drop=True)
 
     # OT daily + pay
     def add_pay_columns(daily_df: pd.DataFrame):
-        df=daily_df.copy(); base=HOURLY_WAGE
-        for k in ["total","evening","night","weekend","holiday"]:
-            df[f"hours_{k}"]=df[f"minutes_{k}"].apply(minutes_to_hours)
-
-        # "בוקר" = כל מה שלא ערב/לילה
-        df["hours_morning"] = (df["hours_total"] - df["hours_evening"] - df["hours_night"]).clip(lower=0)
-
-        df["pay_base"]=df["hours_total"]*base
-        df["pay_evening_bonus"]=df["hours_evening"]*base*EVENING_BONUS
-        df["pay_night_bonus"]=df["hours_night"]*base*NIGHT_BONUS
-        df["pay_weekend_bonus"]=df["hours_weekend"]*base*WEEKEND_BONUS
-        df["pay_holiday_bonus"]=df["hours_holiday"]*base*HOLIDAY_BONUS
-
-        overtime=(df["hours_total"]-params["DAILY_REGULAR_HOURS"]).clip(lower=0)
-        df["hours_ot_t1"]=overtime.clip(upper=params["DAILY_T1_HOURS"])
-        df["hours_ot_t2"]=(overtime-df["hours_ot_t1"]).clip(lower=0)
-        df["pay_overtime_t1"]=df["hours_ot_t1"]*base*OVERTIME_T1_BONUS
-        df["pay_overtime_t2"]=df["hours_ot_t2"]*base*OVERTIME_T2_BONUS
+        df=daily_df; base=HOURLY_WAGE
+        # כל עמודות הדקות כמטריצה אחת (n,5): שעות ותוספות בפעולות וקטוריות על כל הטבלה
+        M=df[["minutes_total","minutes_evening","minutes_night","minutes_weekend","minutes_holiday"]].to_numpy(dtype=np.float64)
+        H=M/60.0
+        pay=H*base*np.array([1.0,EVENING_BONUS,NIGHT_BONUS,WEEKEND_BONUS,HOLIDAY_BONUS])
+
+        overtime=np.maximum(H[:,0]-DAILY_REGULAR_HOURS,0.0)
+        ot1=np.minimum(overtime,DAILY_T1_HOURS)
+        ot2=np.maximum(overtime-ot1,0.0)
+
+        cols={
+            "hours_total":H[:,0],"hours_evening":H[:,1],"hours_night":H[:,2],"hours_weekend":H[:,3],"hours_holiday":H[:,4],
+            # "בוקר" = כל מה שלא ערב/לילה
+            "hours_morning":np.maximum(H[:,0]-H[:,1]-H[:,2],0.0),
+            "pay_base":pay[:,0],"pay_evening_bonus":pay[:,1],"pay_night_bonus":pay[:,2],
+            "pay_weekend_bonus":pay[:,3],"pay_holiday_bonus":pay[:,4],
+            "hours_ot_t1":ot1,"hours_ot_t2":ot2,
+            "pay_overtime_t1":ot1*base*OVERTIME_T1_BONUS,"pay_overtime_t2":ot2*base*OVERTIME_T2_BONUS,
+        }
+        for c,v in cols.items(): df[c]=v
 
         # -------- FIX 2: נסיעות פעם אחת ליום --------
         df["travel_pay"]=0.0
-        for d, g in df.groupby("תאריך", sort=False):
-            idx = g.index[(g["worked_day"]) & (~g["is_sick"])].tolist()
-            if idx:
-                df.loc[idx[0], "travel_pay"] = DAILY_TRAVEL
-
-        df["pay_total_day"]=(df["pay_base"]+df["pay_evening_bonus"]+df["pay_night_bonus"]+
-                             df["pay_weekend_bonus"]+df["pay_holiday_bonus"]+
-                             df["pay_overtime_t1"]+df["pay_overtime_t2"]+df["travel_pay"])
+        eligible=df[df["worked_day"] & ~df["is_sick"]]
+        df.loc[eligible.drop_duplicates(subset="תאריך", keep="first").index, "travel_pay"]=DAILY_TRAVEL
+
+        df["pay_total_day"]=(pay[:,0]+pay[:,1]+pay[:,2]+pay[:,3]+pay[:,4]+
+                             cols["pay_overtime_t1"]+cols["pay_overtime_t2"]+df["travel_pay"].to_numpy())
         return df
 
     # Weekly top-up (42h)
-    def week_period_series(dates, week_start_str):
-        freq = "W-SAT" if week_start_str == "Sunday" else "W-SUN"
-        return pd.to_datetime(dates).dt.to_period(freq)
+    def week_codes(days, week_start_str):
+        # days = ימים מאז 1970-01-01 (יום חמישי); ההזזה מביאה את ראשון/שני לכפולה של 7
+        return (days + (4 if week_start_str == "Sunday" else 3)) // 7
 
     def compute_weekly_overtime_topup(daily_df, weekly_threshold=42.0, week_start_str="Sunday"):
-        df = daily_df.copy()
-        df["__week"] = week_period_series(df["תאריך"], week_start_str)
+        df = daily_df
         df["weekly_topup_125"] = 0.0
         df["weekly_topup_150"] = 0.0
         df["hours_regular_day"] = df["hours_total"].clip(upper=params["DAILY_REGULAR_HOURS"])
 
-        for _, g in df.groupby("__week", sort=False):
-            g_sorted = g.sort_values("תאריך")
-            total_reg = float(g_sorted["hours_regular_day"].sum())
-            excess = max(0.0, total_reg - weekly_threshold)
-            if excess <= 0:
-                continue
-            remain = excess
-            for idx in g_sorted.index:
-                if remain <= 0: break
-                take = min(float(df.loc[idx, "hours_regular_day"]), remain)
-                df.loc[idx, "weekly_topup_125"] += take * HOURLY_WAGE * OVERTIME_T1_BONUS
-                remain -= take
-
-        return df.drop(columns="__week")
+        days = pd.to_datetime(df["תאריך"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+        order = np.argsort(days, kind="stable")  # קוד השבוע מונוטוני בתאריך – מיון לפי תאריך מספיק
+        hours = df["hours_regular_day"].to_numpy(dtype=np.float64)[order]
+        codes = week_codes(days, week_start_str)[order]
+        week_totals = np.array([w.sum() for w in np.split(hours, np.flatnonzero(np.diff(codes)) + 1)])
+        topup = np.zeros(len(df))
+        # take*HOURLY_WAGE בקרנל ו-*OVERTIME_T1_BONUS כאן – אותו סדר הכפלה כמו take*HOURLY_WAGE*OVERTIME_T1_BONUS
+        topup[order] = allocate_weekly_topup(hours, codes, week_totals, float(weekly_threshold), float(HOURLY_WAGE))
+        df["weekly_topup_125"] = topup * OVERTIME_T1_BONUS
+        return df
 
     # Sick pay
-    def add_sick_pay(daily_df: pd.DataFrame, selected_df: pd.DataFrame):
-        df=daily_df.copy()
+    def sick_avg_hours(daily_df: pd.DataFrame) -> float:
         avg_hours=DEFAULT_DAILY_SICK_HOURS
         if USE_AVG_HOURS_FOR_SICK:
-            wh=df.loc[df["worked_day"],"hours_total"]
+            wh=daily_df.loc[daily_df["worked_day"],"hours_total"]
             if len(wh)>0: avg_hours=float(wh.mean())
-        sick_dates=[]
-        for _,r in selected_df.iterrows():
-            s=str(r.get("סטטוס/הערות","") or "").strip()
-            if is_sick(s) and not is_no_att(s):
-                try: sick_dates.append(parse_date(str(r["תאריך"])))
-                except: pass
-        if not sick_dates:
-            df["pay_sick"]=0.0; return df
-        sick_dates=sorted(set(sick_dates))
-        pay_map={}; i=0
-        while i<len(sick_dates):
-            j=i+1
-            while j<len(sick_dates) and (sick_dates[j]-sick_dates[j-1]).days==1: j+=1
-            seq=sick_dates[i:j]
-            for k,d in enumerate(seq, start=1):
-                pct=0.0 if k==1 else (0.5 if k in (2,3) else 1.0)
-                pay_map[d]=avg_hours*HOURLY_WAGE*pct
-            i=j
+        return avg_hours
+
+    def compute_sick_pay_map(daily_df: pd.DataFrame, avg_hours: float) -> dict:
+        """תאריך -> תשלום מחלה (יום 1: 0%, ימים 2–3: 50%, מהיום הרביעי: 100% לכל רצף).
+        ימי המחלה נלקחים מ-is_sick שכבר סווג ב-compute_daily_rows – בלי סריקה נוספת של הסטטוסים."""
+        sick_dates=sorted(set(daily_df.loc[daily_df["is_sick"],"תאריך"]))
+        # מספר היום בתוך רצף: מרחק מתחילת הרצף (שבירה היכן שהפער אינו יום אחד) + 1
+        ords=np.array([d.toordinal() for d in sick_dates],dtype=np.int64)
+        idx=np.arange(len(ords))
+        run_start=np.maximum.accumulate(np.where(np.diff(ords,prepend=ords[:1]-2)!=1,idx,0)) if len(ords) else idx
+        k=idx-run_start+1
+        pct=np.where(k==1,0.0,np.where(k<=3,0.5,1.0))
+        return dict(zip(sick_dates,(avg_hours*HOURLY_WAGE*pct).tolist()))
+
+    def apply_sick_pay(daily_df: pd.DataFrame, pay_map: dict):
+        df=daily_df
         df["pay_sick"]=0.0
-        for d,pay in pay_map.items():
-            if d in df["תאריך"].values:
-                df.loc[df["תאריך"]==d,[
-                    "pay_base","pay_evening_bonus","pay_night_bonus","pay_weekend_bonus","pay_holiday_bonus",
-                    "pay_overtime_t1","pay_overtime_t2","travel_pay","pay_total_day","weekly_topup_125","weekly_topup_150"
-                ]]=0.0
-                df.loc[df["תאריך"]==d,"pay_sick"]=pay
-            else:
-                df=pd.concat([df,pd.DataFrame([{
-                    "תאריך":d,"סטטוס/הערות":"מחלה","is_sick":True,"holiday":False,"start":None,"end":None,
-                    "minutes_total":0,"minutes_evening":0,"minutes_night":0,"minutes_weekend":0,"minutes_holiday":0,
-                    "worked_day":False,
-                    "hours_total":0.0,"hours_evening":0.0,"hours_night":0.0,"hours_weekend":0.0,"hours_holiday":0.0,
-                    "hours_morning":0.0,
-                    "hours_ot_t1":0.0,"hours_ot_t2":0.0,
-                    "pay_base":0.0,"pay_evening_bonus":0.0,"pay_night_bonus":0.0,"pay_weekend_bonus":0.0,"pay_holiday_bonus":0.0,
-                    "pay_overtime_t1":0.0,"pay_overtime_t2":0.0,"weekly_topup_125":0.0,"weekly_topup_150":0.0,
-                    "travel_pay":0.0,"pay_total_day":0.0,"pay_sick":pay
-                }])], ignore_index=True)
+        if not pay_map: return df
+        # ימים שכבר קיימים בטבלה: איפוס שכר העבודה ורישום מחלה – בהשמה אחת
+        present=df["תאריך"].isin(pay_map.keys())
+        if present.any():
+            df.loc[present,[
+                "pay_base","pay_evening_bonus","pay_night_bonus","pay_weekend_bonus","pay_holiday_bonus",
+                "pay_overtime_t1","pay_overtime_t2","travel_pay","pay_total_day","weekly_topup_125","weekly_topup_150"
+            ]]=0.0
+            df.loc[present,"pay_sick"]=df.loc[present,"תאריך"].map(pay_map)
+        # ימי מחלה חסרים: בונים את כל השורות יחד ומשרשרים פעם אחת
+        existing=set(df["תאריך"])
+        missing=[d for d in pay_map if d not in existing]
+        if missing:
+            df=pd.concat([df,pd.DataFrame({
+                "תאריך":missing,"סטטוס/הערות":"מחלה","is_sick":True,"holiday":False,"start":None,"end":None,
+                "minutes_total":0,"minutes_evening":0,"minutes_night":0,"minutes_weekend":0,"minutes_holiday":0,
+                "worked_day":False,
+                "hours_total":0.0,"hours_evening":0.0,"hours_night":0.0,"hours_weekend":0.0,"hours_holiday":0.0,
+                "hours_morning":0.0,
+                "hours_ot_t1":0.0,"hours_ot_t2":0.0,
+                "pay_base":0.0,"pay_evening_bonus":0.0,"pay_night_bonus":0.0,"pay_weekend_bonus":0.0,"pay_holiday_bonus":0.0,
+                "pay_overtime_t1":0.0,"pay_overtime_t2":0.0,"weekly_topup_125":0.0,"weekly_topup_150":0.0,
+                "travel_pay":0.0,"pay_total_day":0.0,"pay_sick":[pay_map[d] for d in missing]
+            })], ignore_index=True)
         return df.sort_values("תאריך").reset_index(drop=True)
 
     def summarize_hours(df_paid: pd.DataFrame):
@@ -394,15 +394,16 @@ def build_processor(params):
             if c not in df_paid.columns: df_paid[c]=0.0
         return df_paid[hours_cols].sum()
 
-    # taxes
-    def income_tax_before_credit(monthly_taxable: float)->float:
-        tax=0.0; last=0.0
-        for cap,rate in TAX_BRACKETS:
-            if monthly_taxable>cap: tax+=(cap-last)*rate; last=cap
-            else:
-                tax+=(monthly_taxable-last)*rate
-                return max(0.0,round(tax,2))
-        return max(0.0,round(tax,2))
+    # taxes – המדרגות כמערכים; הפונקציה מקבלת סכום בודד או מערך של סכומים
+    tax_caps=np.array([c for c,_ in TAX_BRACKETS],dtype=np.float64)
+    tax_rates=np.array([r for _,r in TAX_BRACKETS],dtype=np.float64)
+    tax_lowers=np.concatenate([[0.0],tax_caps[:-1]])[:len(tax_caps)]
+    tax_widths=tax_caps-tax_lowers
+    def income_tax_before_credit(monthly_taxable):
+        x=np.asarray(monthly_taxable,dtype=np.float64)
+        in_bracket=np.clip(x[...,None]-tax_lowers,0.0,tax_widths)
+        tax=np.maximum(0.0,(in_bracket*tax_rates).sum(-1))
+        return np.round(tax[()],2) if tax.ndim==0 else np.round(tax,2)  # np.float64 כמו במקור – עיגול של NumPy
     def apply_credit_points(tax_before: float)->float:
         return max(0.0, round(tax_before - CREDIT_POINTS*CREDIT_POINT_VALUE, 2))
     def ni_health(monthly_gross: float):
@@ -414,15 +415,19 @@ def build_processor(params):
         selected=load_attendance_from_csv(csv_df)
         daily=compute_daily_rows(selected)
         paid=add_pay_columns(daily)
+        # מפת ימי המחלה מחושבת פעם אחת ומוחלת על כל מודל
+        sick_pay_map=compute_sick_pay_map(paid, sick_avg_hours(paid))
 
+        # השלבים משנים את ה-df שלהם במקום; מעתיקים רק כש-paid נדרש גם למודל היומי (max)
         if OT_BASIS in ("Weekly 42h only", "Daily + Weekly (max)"):
-            paid_week = compute_weekly_overtime_topup(paid, weekly_threshold=42.0, week_start_str=WEEK_START)
+            paid_week = compute_weekly_overtime_topup(paid.copy() if OT_BASIS == "Daily + Weekly (max)" else paid,
+                                                      weekly_threshold=42.0, week_start_str=WEEK_START)
             paid_week["pay_weekly_topup"] = paid_week["weekly_topup_125"] + paid_week["weekly_topup_150"]
         else:
-            paid_week = paid.copy()
+            paid_week = paid
             paid_week["pay_weekly_topup"] = 0.0
 
-        paid_week = add_sick_pay(paid_week, selected)
+        paid_week = apply_sick_pay(paid_week, sick_pay_map)
 
         if OT_BASIS == "Weekly 42h only":
             for c in ("pay_overtime_t1","pay_overtime_t2"):
@@ -435,41 +440,33 @@ def build_processor(params):
             paid_final = paid_week
         elif OT_BASIS == "Daily + Weekly (max)":
             modelA = paid.copy(); modelA["pay_weekly_topup"]=0.0
-            modelA = add_sick_pay(modelA, selected)
+            modelA = apply_sick_pay(modelA, sick_pay_map)
             modelA["pay_total_day_final"] = modelA["pay_total_day"]
 
-            modelB = paid_week.copy()
-            modelB_no_daily = paid.copy()
-            for c in ("pay_overtime_t1","pay_overtime_t2"):
-                if c in modelB_no_daily.columns: modelB_no_daily[c]=0.0
+            # מודל B: שכר ללא שעות נוספות יומיות (עמודות ה-OT אינן בסכום) + טופ-אפ שבועי
+            modelB = paid_week
             modelB["pay_total_day_final"] = (
-                modelB_no_daily["pay_base"] + modelB_no_daily["pay_evening_bonus"] + modelB_no_daily["pay_night_bonus"] +
-                modelB_no_daily["pay_weekend_bonus"] + modelB_no_daily["pay_holiday_bonus"] +
-                modelB_no_daily["travel_pay"] + modelB["pay_weekly_topup"]
+                paid["pay_base"] + paid["pay_evening_bonus"] + paid["pay_night_bonus"] +
+                paid["pay_weekend_bonus"] + paid["pay_holiday_bonus"] +
+                paid["travel_pay"] + modelB["pay_weekly_topup"]
             )
 
-            paid_final = modelA.copy()
+            paid_final = modelA
             choose = modelB["pay_total_day_final"] > modelA["pay_total_day_final"]
             paid_final["pay_total_day"] = modelA["pay_total_day_final"]
             paid_final.loc[choose,"pay_total_day"] = modelB.loc[choose,"pay_total_day_final"]
             paid_final["pay_weekly_topup"]=0.0
         else:
-            paid_final = paid_week.copy()
+            paid_final = paid_week
             paid_final["pay_weekly_topup"]=0.0
 
-        sums_hours = summarize_hours(paid_final)
-        wage_components = (
-            paid_final["pay_base"].sum()
-            + paid_final["pay_evening_bonus"].sum()
-            + paid_final["pay_night_bonus"].sum()
-            + paid_final["pay_weekend_bonus"].sum()
-            + paid_final["pay_holiday_bonus"].sum()
-            + paid_final.get("pay_overtime_t1",0).sum()
-            + paid_final.get("pay_overtime_t2",0).sum()
-            + paid_final.get("pay_weekly_topup",0).sum()
-            + paid_final["pay_sick"].sum()
-        )
-        travel_sum = paid_final["travel_pay"].sum()
+        # כל סכומי הרכיבים במעבר אחד: שורה לכל עמודה (רציפה – אותו סכום כמו Series.sum)
+        pay_cols = ["pay_base","pay_evening_bonus","pay_night_bonus","pay_weekend_bonus","pay_holiday_bonus",
+                    "pay_overtime_t1","pay_overtime_t2","pay_weekly_topup","pay_sick","travel_pay"]
+        sums = np.ascontiguousarray(paid_final[pay_cols].to_numpy(dtype=np.float64).T).sum(axis=1)
+        # נשארים np.float64 (כמו Series.sum) – round() של הניכויים מעגל כמו NumPy, כמו במקור
+        base_s, eve_s, night_s, weekend_s, holiday_s, ot1_s, ot2_s, topup_s, sick_s, travel_sum = sums
+        wage_components = base_s + eve_s + night_s + weekend_s + holiday_s + ot1_s + ot2_s + topup_s + sick_s
         monthly_gross_taxable = wage_components + travel_sum + SIBUS_MONTHLY
 
         pension_base = monthly_gross_taxable if PENSION_BASE_MODE=="include_all" else wage_components
@@ -480,19 +477,19 @@ def build_processor(params):
         net = monthly_gross_taxable - (employee_pension + ni + health + tax_after)
 
         brk = pd.DataFrame([
-            ["שכר בסיס", paid_final["pay_base"].sum()],
-            ["תוספת ערב", paid_final["pay_evening_bonus"].sum()],
-            ["תוספת לילה", paid_final["pay_night_bonus"].sum()],
-            ["תוספת סופ\"ש", paid_final["pay_weekend_bonus"].sum()],
-            ["תוספת חג", paid_final["pay_holiday_bonus"].sum()],
-            ["שעות נוספות 125%", paid_final.get("pay_overtime_t1",0).sum()],
-            ["שעות נוספות 150%", paid_final.get("pay_overtime_t2",0).sum()],
-            ["טופ-אפ שבועי 42ש׳", paid_final.get("pay_weekly_topup",0).sum()],
-            ["מחלה", paid_final["pay_sick"].sum()],
+            ["שכר בסיס", base_s],
+            ["תוספת ערב", eve_s],
+            ["תוספת לילה", night_s],
+            ["תוספת סופ\"ש", weekend_s],
+            ["תוספת חג", holiday_s],
+            ["שעות נוספות 125%", ot1_s],
+            ["שעות נוספות 150%", ot2_s],
+            ["טופ-אפ שבועי 42ש׳", topup_s],
+            ["מחלה", sick_s],
             ["נסיעות", travel_sum],
             ["סיבוס", SIBUS_MONTHLY],
             ["סה\"כ ברוטו חייב", monthly_gross_taxable],
-        ], columns=["רכיב", "סכום"]).style.format({"סכום": money})
+        ], columns=["רכיב", "סכום"])
 
         deds = pd.DataFrame([
             ["פנסיה עובד", employee_pension],
@@ -501,23 +498,11 @@ def build_processor(params):
             ["מס הכנסה לפני זיכוי", tax_before],
             [f"זיכוי מס (נק׳ × {CREDIT_POINT_VALUE:.0f})", tax_before - tax_after],
             ["מס הכנסה לתשלום", tax_after],
-        ], columns=["ניכוי", "סכום"]).style.format({"סכום": money})
+        ], columns=["ניכוי", "סכום"])
 
         charts_df = pd.DataFrame({
             "רכיב": ["שכר בסיס","ערב","לילה","סופ\"ש","חג","OT 125%","OT 150%","טופ-אפ שבועי","מחלה","נסיעות","סיבוס"],
-            "סכום": [
-                paid_final["pay_base"].sum(),
-                paid_final["pay_evening_bonus"].sum(),
-                paid_final["pay_night_bonus"].sum(),
-                paid_final["pay_weekend_bonus"].sum(),
-                paid_final["pay_holiday_bonus"].sum(),
-                paid_final.get("pay_overtime_t1",0).sum(),
-                paid_final.get("pay_overtime_t2",0).sum(),
-                paid_final.get("pay_weekly_topup",0).sum(),
-                paid_final["pay_sick"].sum(),
-                travel_sum,
-                SIBUS_MONTHLY,
-            ]
+            "סכום": [base_s, eve_s, night_s, weekend_s, holiday_s, ot1_s, ot2_s, topup_s, sick_s, travel_sum, SIBUS_MONTHLY]
         })
 
         # exports
@@ -529,13 +514,10 @@ def build_processor(params):
         }, ensure_ascii=False, indent=2).encode("utf-8")
 
         # sick days counters
-        sick_df = paid_final.copy()
-        if "is_sick" not in sick_df.columns:
-            sick_df["is_sick"] = False
-        if "pay_sick" not in sick_df.columns:
-            sick_df["pay_sick"] = 0.0
-        total_sick_days  = int((sick_df["is_sick"] == True).sum())
-        paid_sick_days   = int(((sick_df["is_sick"] == True) & (sick_df["pay_sick"] > 0)).sum())
+        sick_mask = (paid_final["is_sick"] == True) if "is_sick" in paid_final.columns else pd.Series(False, index=paid_final.index)
+        pay_sick  = paid_final["pay_sick"] if "pay_sick" in paid_final.columns else 0.0
+        total_sick_days  = int(sick_mask.sum())
+        paid_sick_days   = int((sick_mask & (pay_sick > 0)).sum())
         unpaid_sick_days = total_sick_days - paid_sick_days
 
         return (
@@ -545,6 +527,42 @@ def build_processor(params):
 
     return process
 
+def params_key(params):
+    """ממיר את מילון הפרמטרים לטאפל ממוין ובר-גיבוב (רשימות הופכות לטאפלים)."""
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_processor(params_items: tuple):
+    """מעבד אחד לכל סט פרמטרים (ה-process עצמו אינו שומר מצב, ולכן בטוח לשיתוף)."""
+    return build_processor(dict(params_items))
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def run_processor(params_items: tuple, csv_bytes: bytes):
+    """חישוב מלא, שמור במטמון לפי הפרמטרים ותוכן הטבלה – rerun ללא שינוי חוזר מיד."""
+    return get_processor(params_items)(read_csv_bytes(csv_bytes))
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def result_tables(params_items: tuple, csv_bytes: bytes):
+    """טבלאות התצוגה של שלב 3 (שעות, ימי מחלה, גרף) – נבנות פעם אחת לכל תוצאה ולא בכל rerun."""
+    (_, sums_hours, _, _, charts_df, _, _, _, _, sick_all, sick_paid, sick_unpaid) = run_processor(params_items, csv_bytes)
+    hours_df = pd.DataFrame([
+        ["סה\"כ שעות",  sums_hours.get("hours_total",  0.0)],
+        ["בוקר",        sums_hours.get("hours_morning",0.0)],
+        ["ערב",         sums_hours.get("hours_evening",0.0)],
+        ["לילה",        sums_hours.get("hours_night",  0.0)],
+        ["סופ\"ש",      sums_hours.get("hours_weekend",0.0)],
+        ["חג",          sums_hours.get("hours_holiday",0.0)],
+        ["נוספות 125%", sums_hours.get("hours_ot_t1",  0.0)],
+        ["נוספות 150%", sums_hours.get("hours_ot_t2",  0.0)],
+    ], columns=["קטגוריה","שעות"])
+    sick_tbl = pd.DataFrame([
+        ["סה\"כ ימי מחלה",      sick_all],
+        ["ימי מחלה בתשלום",     sick_paid],
+        ["ימי מחלה ללא תשלום",  sick_unpaid],
+    ], columns=["קטגוריה", "כמות"])
+    chart_df = charts_df.sort_values("סכום", ascending=False).head(8).set_index("רכיב")
+    return hours_df, sick_tbl, chart_df
+
 # =========================
 # Sidebar – settings
 # =========================
@@ -627,13 +645,35 @@ params = {
 if "step" not in st.session_state: st.session_state.step = 1
 if "input_df_raw" not in st.session_state: st.session_state.input_df_raw = None
 if "input_df_edited" not in st.session_state: st.session_state.input_df_edited = None
+if "input_csv" not in st.session_state: st.session_state.input_csv = None  # הטבלה המאושרת כ-CSV – מפתח המטמון של החישוב
+
+@st.cache_data(show_spinner=False)
+def pdf_to_df(pdf_bytes: bytes, heb_mode: str):
+    """חילוץ טבלת הנוכחות מה-PDF (שמור במטמון לפי תוכן הקובץ); None אם לא נמצאה טבלה."""
+    import pdfplumber
+    df=None
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        # רק הטבלה המתאימה הראשונה נדרשת – עוצרים בה ולא מחלצים את שאר העמודים
+        for page in pdf.pages:
+            for t in (page.extract_tables() or []):
+                cand=pd.DataFrame(t)
+                if cand.shape[1]>=6 and cand.dropna(how="all").shape[0]>0:
+                    df=cand; break
+            if df is not None: break
+    if df is None:
+        return None
+    cols_map = {2:"סה\"כ נוכחות", 3:"שעת יציאה", 4:"שעת כניסה", 5:"סטטוס/הערות", 7:"יום בשבוע", 8:"תאריך"}
+    df_in = df.rename(columns=cols_map)
+    need = ["סה\"כ נוכחות","שעת יציאה","שעת כניסה","סטטוס/הערות","יום בשבוע","תאריך"]
+    df_in = df_in[[c for c in need if c in df_in.columns]].copy()
+    # תיקון תאריך/יום חסרים משורה שנייה של אותו יום
+    df_in[["תאריך", "יום בשבוע"]] = blank_ffill(df_in[["תאריך", "יום בשבוע"]])
+    return apply_hebrew_correction(df_in, mode=heb_mode)
 
 st.title("💸 מחשבון שכר – אשף זרימה")
 def step_header(num, title):
     st.markdown(f'<div class="step"><div class="num">{num}</div><div class="title">{title}</div></div>', unsafe_allow_html=True)
 
-processor = build_processor(params)
-
 # =========================
 # Step 1: Upload
 # =========================
@@ -646,40 +686,20 @@ if st.session_state.step == 1:
         st.caption("דרוש CSV עם העמודות: סה\"כ נוכחות, שעת יציאה, שעת כניסה, סטטוס/הערות, יום בשבוע, תאריך")
         up = st.file_uploader("בחר קובץ CSV", type=["csv"], key="u_csv")
         if up is not None:
-            try: df_in = pd.read_csv(up, encoding="utf-8-sig")
-            except UnicodeDecodeError: df_in = pd.read_csv(up)
+            raw = up.getvalue()  # קריאה אחת; utf-8-sig מטפל גם בקובץ בלי BOM
+            try: df_in = pd.read_csv(io.BytesIO(raw), encoding="utf-8-sig")
+            except UnicodeDecodeError: df_in = pd.read_csv(io.BytesIO(raw), encoding="cp1255")  # CSV עברי מ-Excel ישן
     else:
         st.caption("PDF של דוח נוכחות. נחלץ טבלה ותתבצע התאמת עברית חכמה.")
         heb_fix_mode = st.selectbox("מצב תיקון עברית מה-PDF", ["אוטומטי","לא להפוך","להפוך תמיד"], index=0)
         up = st.file_uploader("בחר קובץ PDF", type=["pdf"], key="u_pdf")
         if up is not None:
             try:
-                import pdfplumber
-                with pdfplumber.open(up) as pdf:
-                    tables=[]
-                    for page in pdf.pages:
-                        for t in (page.extract_tables() or []):
-                            df=pd.DataFrame(t)
-                            if df.shape[1]>=6 and df.dropna(how="all").shape[0]>0:
-                                tables.append(df)
-                if not tables:
+                mode_map = {"אוטומטי":"auto","לא להפוך":"off","להפוך תמיד":"on"}
+                df_in = pdf_to_df(up.getvalue(), mode_map[heb_fix_mode])
+                if df_in is None:
                     st.error("לא נמצאו טבלאות מתאימות ב־PDF")
                 else:
-                    df=tables[0].reset_index(drop=True).copy()
-                    cols_map = {2:"סה\"כ נוכחות", 3:"שעת יציאה", 4:"שעת כניסה", 5:"סטטוס/הערות", 7:"יום בשבוע", 8:"תאריך"}
-                    df_in = df.rename(columns=cols_map)
-                    need = ["סה\"כ נוכחות","שעת יציאה","שעת כניסה","סטטוס/הערות","יום בשבוע","תאריך"]
-                    df_in = df_in[[c for c in need if c in df_in.columns]].copy()
-                    # תיקון תאריך/יום חסרים משורה שנייה של אותו יום
-                    for col in ["תאריך", "יום בשבוע"]:
-                        if col in df_in.columns:
-                            df_in[col] = df_in[col].astype(str).str.strip()
-                            df_in[col] = df_in[col].replace(
-                                {"None": pd.NA, "nan": pd.NA, "NaN": pd.NA, "": pd.NA, ".": pd.NA})
-                    df_in[["תאריך", "יום בשבוע"]] = df_in[["תאריך", "יום בשבוע"]].ffill()
-
-                    mode_map = {"אוטומטי":"auto","לא להפוך":"off","להפוך תמיד":"on"}
-                    df_in = apply_hebrew_correction(df_in, mode=mode_map[heb_fix_mode])
                     st.success("טבלה חולצה. ממשיכים לעריכה…")
             except ModuleNotFoundError:
                 st.error("נדרש: pip install pdfplumber")
@@ -687,8 +707,12 @@ if st.session_state.step == 1:
                 st.error(f"שגיאת חילוץ PDF: {e}")
 
     if df_in is not None:
+        # עמודות Arrow (pyarrow מגיע עם streamlit): data_editor מציג אותן בלי קידוד מחדש בכל rerun.
+        # מספרים נשארים double – עמודת שלמים הייתה חוסמת עריכה של ערכים כמו 8.5
+        df_in = df_in.convert_dtypes(dtype_backend="pyarrow", convert_integer=False)
         st.session_state.input_df_raw = df_in
-        st.session_state.input_df_edited = df_in.copy()  # נשמור גם כבסיס לעריכה
+        st.session_state.input_df_edited = df_in  # נשמור גם כבסיס לעריכה (אותו אובייקט – אף שלב אינו משנה אותו)
+        st.session_state.input_csv = None
         st.session_state.step = 2
         st.rerun()
 
@@ -729,14 +753,16 @@ elif st.session_state.step == 2:
 
         # חשוב: שמירה מפורשת רק לאחר לחיצה
         if back_btn:
-            st.session_state.input_df_raw    = edited.copy()   # נשמרת העריכה
-            st.session_state.input_df_edited = edited.copy()
+            st.session_state.input_df_raw    = edited   # נשמרת העריכה (data_editor מחזיר טבלה חדשה – אין צורך בהעתקה)
+            st.session_state.input_df_edited = edited
+            st.session_state.input_csv = None
             st.session_state.step = 1
             st.rerun()
 
         if next_btn:
-            st.session_state.input_df_raw    = edited.copy()   # נשמרת העריכה
-            st.session_state.input_df_edited = edited.copy()
+            st.session_state.input_df_raw    = edited   # נשמרת העריכה (data_editor מחזיר טבלה חדשה – אין צורך בהעתקה)
+            st.session_state.input_df_edited = edited
+            st.session_state.input_csv = None
             st.session_state.step = 3
             st.rerun()
 
@@ -753,8 +779,11 @@ elif st.session_state.step == 3:
             st.rerun()
     else:
         try:
-            (paid_df, sums_hours, brk_style, deds_style, charts_df, net, gross,
-             csv_bytes, json_bytes, sick_all, sick_paid, sick_unpaid) = build_processor(params)(st.session_state.input_df_edited)
+            if st.session_state.input_csv is None:  # פעם אחת לכל טבלה מאושרת, לא בכל rerun
+                st.session_state.input_csv = st.session_state.input_df_edited.to_csv(index=False).encode("utf-8")
+            (paid_df, _, brk_df, deds_df, _, net, gross,
+             csv_bytes, json_bytes, _, _, _) = run_processor(params_key(params), st.session_state.input_csv)
+            hours_df, sick_tbl, chart_df = result_tables(params_key(params), st.session_state.input_csv)
 
             # KPIs
             k1,k2,k3 = st.columns(3)
@@ -777,20 +806,19 @@ elif st.session_state.step == 3:
 
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.markdown("#### פירוט רכיבי ברוטו")
-            st.dataframe(brk_style, use_container_width=True)
+            st.dataframe(brk_df.style.format({"סכום": money}), use_container_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
 
             cA, cB = st.columns([1.2, 1])
             with cA:
                 st.markdown('<div class="card">', unsafe_allow_html=True)
                 st.markdown("#### רכיבי שכר (גרף עמודות)")
-                chart_df = charts_df.sort_values("סכום", ascending=False).head(8).set_index("רכיב")
                 st.bar_chart(chart_df)
                 st.markdown('</div>', unsafe_allow_html=True)
             with cB:
                 st.markdown('<div class="card">', unsafe_allow_html=True)
                 st.markdown("#### ניכויים")
-                st.dataframe(deds_style, use_container_width=True)
+                st.dataframe(deds_df.style.format({"סכום": money}), use_container_width=True)
                 st.markdown('</div>', unsafe_allow_html=True)
 
             # שעות + מחלה
@@ -798,23 +826,8 @@ elif st.session_state.step == 3:
             st.markdown("#### סיכום שעות")
             colH, colS = st.columns([1.2, 0.8])
             with colH:
-                hours_df = pd.DataFrame([
-                    ["סה\"כ שעות",  sums_hours.get("hours_total",  0.0)],
-                    ["בוקר",        sums_hours.get("hours_morning",0.0)],
-                    ["ערב",         sums_hours.get("hours_evening",0.0)],
-                    ["לילה",        sums_hours.get("hours_night",  0.0)],
-                    ["סופ\"ש",      sums_hours.get("hours_weekend",0.0)],
-                    ["חג",          sums_hours.get("hours_holiday",0.0)],
-                    ["נוספות 125%", sums_hours.get("hours_ot_t1",  0.0)],
-                    ["נוספות 150%", sums_hours.get("hours_ot_t2",  0.0)],
-                ], columns=["קטגוריה","שעות"])
                 st.dataframe(hours_df.style.format({"שעות":"{:.2f}"}), use_container_width=True, hide_index=True)
             with colS:
-                sick_tbl = pd.DataFrame([
-                    ["סה\"כ ימי מחלה",      sick_all],
-                    ["ימי מחלה בתשלום",     sick_paid],
-                    ["ימי מחלה ללא תשלום",  sick_unpaid],
-                ], columns=["קטגוריה", "כמות"])
                 st.dataframe(sick_tbl, use_container_width=True, hide_index=True)
             st.markdown('</div>', unsafe_allow_html=True)
 
@@ -831,7 +844,7 @@ elif st.session_state.step == 3:
             with c3:
                 if st.button("⬅️ חזור לעריכה", use_container_width=True):
                     # נשמור את הטבלה שאושרה/נערכה קודם
-                    st.session_state.input_df_raw = st.session_state.input_df_edited.copy()
+                    st.session_state.input_df_raw = st.session_state.input_df_edited
                     st.session_state.step = 2
                     st.rerun()
 
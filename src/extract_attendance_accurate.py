@@ -14,10 +14,19 @@ Output:
 - attendance_processed.xlsx / .csv : Only ['תאריך כניסה','יום בשבוע','יום מחלה','סה"כ נוכחות']
   with rows containing 'אין דיווח נוכחות' removed and 'יום מחלה' marked True where 'פעילות' contains 'מחלה'.
 """
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 import pandas as pd
 
+_BIDI_RE = re.compile(r"[\u200e\u200f]")
+_WS_RE = re.compile(r"\s+")
+_DATE_RE_ANY = re.compile(r"\d{2}[./-]\d{2}[./-]\d{4}")
+_HEB_RE = re.compile(r"[א-ת]")
+
 EXPECTED = ['תאריך כניסה','יום בשבוע','סוג יום','פעילות','שעת כניסה','שעת יציאה','סה"כ נוכחות','שעות חוסר לשכר','שעות עודף לשכר']
 
 HEADER_CANON = {
@@ -33,40 +42,42 @@ HEADER_CANON = {
     'שעות עודף לשכר': ['שעות עודף לשכר', 'עודף לשכר'],
 }
 
+@lru_cache(maxsize=8192)
+def _normalize_str(s: str) -> str:
+    return _WS_RE.sub(" ", _BIDI_RE.sub("", s)).strip()  # bidi + whitespace
+
 def normalize_text(s: str) -> str:
     if s is None:
         return ""
-    s = str(s)
-    s = re.sub(r"[\\u200e\\u200f]", "", s)  # bidi
-    s = re.sub(r"\\s+", " ", s).strip()
-    return s
+    # Headers and day names repeat across tables/pages: strings go through the cache
+    return _normalize_str(s if isinstance(s, str) else str(s))
+
+# Variants normalized once, in HEADER_CANON priority order (first canon wins)
+_VARIANTS = [(normalize_text(v), canon) for canon, vs in HEADER_CANON.items() for v in vs]
+_VARIANT_TO_CANON = {}
+for _v, _canon in _VARIANTS:
+    _VARIANT_TO_CANON.setdefault(_v, _canon)
 
 def canonicalize_headers(cols):
     out = []
     for c in cols:
         c_norm = normalize_text(c)
-        mapped = None
-        for canon, variants in HEADER_CANON.items():
-            if c_norm in variants:
-                mapped = canon; break
+        mapped = _VARIANT_TO_CANON.get(c_norm)
         if mapped is None:
             # Try fuzzy contains (handles multi-line split headers like 'סה"כ' + 'נוכחות')
-            for canon, variants in HEADER_CANON.items():
-                for v in variants:
-                    v2 = normalize_text(v)
-                    c2 = normalize_text(c_norm)
-                    if v2 and (v2 in c2 or c2 in v2):
-                        mapped = canon; break
-                if mapped: break
+            mapped = next((canon for v, canon in _VARIANTS
+                           if v and (v in c_norm or c_norm in v)), None)
         out.append(mapped or c_norm)
     return out
 
-def tidy_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    # Drop fully empty columns and rows
-    df = df.copy()
+def tidy_dataframe(df: pd.DataFrame, *, copy: bool = False) -> pd.DataFrame:
+    # Renames/overwrites the columns of df itself (the extractors hand over fresh
+    # frames they don't reuse); pass copy=True to leave the input untouched.
+    if copy:
+        df = df.copy()
     df.columns = [normalize_text(c) for c in df.columns]
     # collapse multiindex-like duplicate header rows: keep first non-empty header row
-    if df.shape[0] > 0 and any(isinstance(x, str) and re.search(r"[א-ת]", x) for x in df.iloc[0].tolist()):
+    if df.shape[0] > 0 and any(isinstance(x, str) and _HEB_RE.search(x) for x in df.iloc[0].tolist()):
         # If first row looks like another header, merge it into columns when necessary
         first_row = [normalize_text(x) for x in df.iloc[0].tolist()]
         if sum(1 for x in first_row if x) >= max(3, int(len(first_row)*0.3)):
@@ -83,14 +94,15 @@ def tidy_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     # Also, if fewer, we keep what's available.
     # Normalize cells
     for c in df.columns:
-        df[c] = df[c].apply(lambda x: normalize_text(x))
+        df[c] = (df[c].astype(object).where(df[c].notna(), "").astype(str)
+                 .str.replace(_BIDI_RE, "", regex=True)
+                 .str.replace(_WS_RE, " ", regex=True)
+                 .str.strip())
 
     # Keep only rows that look like data (date in 'תאריך כניסה' or day name in 'יום בשבוע')
-    def looks_like_date(s):
-        return bool(re.match(r"\\d{2}[./-]\\d{2}[./-]\\d{4}$", s or ""))
-
+    # (a date anywhere in the cell also covers a cell that is only a date)
     if 'תאריך כניסה' in df.columns:
-        df = df[df['תאריך כניסה'].apply(looks_like_date) | df['תאריך כניסה'].astype(str).str.contains(r"\\d{2}[./-]\\d{2}[./-]\\d{4}", regex=True)]
+        df = df[df['תאריך כניסה'].str.contains(_DATE_RE_ANY, regex=True, na=False)]
     df = df.reset_index(drop=True)
 
     # If 'סה"כ נוכחות' was split into two columns (e.g., 'סה"כ' and 'נוכחות'), try to stitch
@@ -102,17 +114,16 @@ def tidy_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     df = df[present]
     return df
 
-def try_camelot(pdf_path, flavor):
+def try_camelot(pdf_path, flavor, pages="all"):
     try:
         import camelot
-        tables = camelot.read_pdf(pdf_path, pages="all", flavor=flavor, strip_text="\\n")
+        tables = camelot.read_pdf(pdf_path, pages=pages, flavor=flavor, strip_text="\\n")
         dfs = [t.df for t in tables]
         # Convert header row to columns
         out = []
         for d in dfs:
             # Promote first non-empty row as header if headers are empty
-            d = d.copy()
-            # Drop completely empty columns
+            # Drop completely empty columns (returns a new frame, t.df stays as is)
             d = d.dropna(axis=1, how="all")
             # If header row is in first row:
             if d.shape[0] > 0:
@@ -122,37 +133,74 @@ def try_camelot(pdf_path, flavor):
         if out:
             return pd.concat(out, ignore_index=True)
     except Exception as e:
-        print(f"[camelot-{flavor}] {e}")
+        print(f"[camelot-{flavor} p.{pages}] {e}")
     return pd.DataFrame()
 
-def try_tabula(pdf_path, lattice=True):
+def try_tabula(pdf_path, lattice=True, pages="all"):
     try:
         import tabula
-        dfs = tabula.read_pdf(pdf_path, pages="all", multiple_tables=True, lattice=lattice, stream=not lattice, guess=False)
+        dfs = tabula.read_pdf(pdf_path, pages=pages, multiple_tables=True, lattice=lattice, stream=not lattice, guess=False)
         out = [tidy_dataframe(d) for d in dfs if isinstance(d, pd.DataFrame)]
         if out:
             return pd.concat(out, ignore_index=True)
     except Exception as e:
-        print(f"[tabula-{'lattice' if lattice else 'stream'}] {e}")
+        print(f"[tabula-{'lattice' if lattice else 'stream'} p.{pages}] {e}")
     return pd.DataFrame()
 
-def main(pdf_path: str, out_csv: str="attendance_full_raw.csv", out_xlsx: str="attendance_full_raw.xlsx",
-         proc_csv: str="attendance_processed.csv", proc_xlsx: str="attendance_processed.xlsx"):
-    # Try extractors
-    df = try_camelot(pdf_path, "lattice")
+def page_numbers(pdf_path):
+    """Page numbers of the PDF via Camelot's own handler; ["all"] if that is unavailable."""
+    try:
+        from camelot.handlers import PDFHandler
+        return [str(p) for p in PDFHandler(pdf_path, pages="all").pages]
+    except Exception as e:
+        print(f"[pages] {e}")
+        return ["all"]
+
+def extract_pages(pdf_path, pages):
+    """Run the extractor chain on the given pages, stopping at the first extractor that finds rows."""
+    df = try_camelot(pdf_path, "lattice", pages)
     if df.empty:
-        df = try_camelot(pdf_path, "stream")
+        df = try_camelot(pdf_path, "stream", pages)
     if df.empty:
-        df = try_tabula(pdf_path, lattice=True)
+        df = try_tabula(pdf_path, lattice=True, pages=pages)
     if df.empty:
-        df = try_tabula(pdf_path, lattice=False)
+        df = try_tabula(pdf_path, lattice=False, pages=pages)
+    return df
+
+def write_xlsx(df: pd.DataFrame, path: str, sheet_name: str):
+    """
+    Stream df to an xlsx sheet in xlsxwriter's constant_memory mode (one row in RAM at a time).
+    DataFrame.to_excel writes column by column, which constant_memory cannot take, so rows
+    are written here top-to-bottom; the header keeps pandas' bold/bordered/centered look.
+    """
+    import xlsxwriter
+    with xlsxwriter.Workbook(path, {"constant_memory": True}) as wb:
+        ws = wb.add_worksheet(sheet_name)
+        ws.write_row(0, 0, [str(c) for c in df.columns],
+                     wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"}))
+        for i, row in enumerate(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None), 1):
+            ws.write_row(i, 0, row)
+
+def main(pdf_path: str, out_csv: str="attendance_full_raw.csv", out_xlsx: str="attendance_full_raw.xlsx",
+         proc_csv: str="attendance_processed.csv", proc_xlsx: str="attendance_processed.xlsx"):
+    # Try extractors page by page: a page the lattice pass already read is not
+    # re-rendered by the stream/Tabula fallbacks, and each page's tables are released
+    # before the next page is parsed. Pages run in separate processes (Ghostscript is
+    # not thread-safe); a single page stays in-process.
+    pages = page_numbers(pdf_path)
+    if len(pages) > 1:
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(pages))) as ex:
+            parts = list(ex.map(extract_pages, repeat(pdf_path), pages))
+    else:
+        parts = [extract_pages(pdf_path, p) for p in pages]
+    parts = [d for d in parts if not d.empty]
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
     if df.empty:
         raise SystemExit("לא הצלחתי לחלץ טבלה בעזרת Camelot/Tabula. ודא שהמותקנים Java (לטאבולה) ו-Ghostscript (לקמלוט).")
 
     # Save full
     df.to_csv(out_csv, index=False, encoding="utf-8-sig")
-    with pd.ExcelWriter(out_xlsx, engine="xlsxwriter") as w:
-        df.to_excel(w, index=False, sheet_name="Raw")
+    write_xlsx(df, out_xlsx, "Raw")
 
     # Build processed view per requirement
     df_proc = df.copy()
@@ -166,8 +214,7 @@ def main(pdf_path: str, out_csv: str="attendance_full_raw.csv", out_xlsx: str="a
     df_proc = df_proc[keep]
 
     df_proc.to_csv(proc_csv, index=False, encoding="utf-8-sig")
-    with pd.ExcelWriter(proc_xlsx, engine="xlsxwriter") as w:
-        df_proc.to_excel(w, index=False, sheet_name="Processed")
+    write_xlsx(df_proc, proc_xlsx, "Processed")
 
     print(f"נשמרו קבצים:\n- {out_csv}\n- {out_xlsx}\n- {proc_csv}\n- {proc_xlsx}")
 
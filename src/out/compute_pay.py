@@ -1,12 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta, time
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
 import math
 import re
 
+try:  # pyarrow אופציונלי – בלעדיו הקריאה נעשית במנוע של pandas
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
 # ===== פרמטרים לפי ההגדרות שלך =====
 HOURLY_WAGE = 65.0  # ש"ח לשעה
 EVENING_BONUS = 0.20  # 20% בין 16:00–24:00
@@ -18,19 +25,19 @@ DAILY_TRAVEL = 22.0   # ש"ח ליום עבודה
 # אם לא רוצים ממוצע שעות בפועל לימי מחלה, אפשר לקבע:
 USE_AVG_HOURS_FOR_SICK = True
 DEFAULT_DAILY_SICK_HOURS = 8.0  # ישומש רק אם USE_AVG_HOURS_FOR_SICK=False
+# אחוז תשלום לפי מספר היום ברצף מחלה (האיבר האחרון חל על יום 4 ואילך)
+SICK_DAY_PCT = np.array([0.0, 0.5, 0.5, 1.0])
 
 # מילות מפתח לזיהוי סטטוסים
 SICK_KEYWORD = "מחלה"
 NO_ATTENDANCE_KEYWORD = "אין דיווח נוכחות"
 HOLIDAY_HINTS = ["חג", "ערב חג"]  # אם תוסיף טקסט מתאים בעמודה – יופעל בונוס חג
+HOLIDAY_RE = re.compile("|".join(map(re.escape, HOLIDAY_HINTS)))  # כל רמזי החג בסריקה אחת
 
 
 # ===== כלים לעבודה עם זמנים וחישוב חיתוכי טווחים =====
 def parse_hhmm(s):
     """ממיר 'HH:MM' ל-time או None אם ריק/NaN."""
-    import math
-    from datetime import datetime
-
     # NaN או None
     if s is None:
         return None
@@ -44,6 +51,11 @@ def parse_hhmm(s):
     if s in {".", "-"}:
         return None
 
+    # מסלול מהיר: H:MM / HH:MM בפירוק ידני; כל צורה אחרת עוברת ל-strptime
+    hh, sep, mm = s.partition(":")
+    if sep and 0 < len(hh) <= 2 and 0 < len(mm) <= 2 and hh.isascii() and mm.isascii() \
+            and hh.isdigit() and mm.isdigit() and int(hh) < 24 and int(mm) < 60:
+        return time(int(hh), int(mm))
     try:
         return datetime.strptime(s, "%H:%M").time()
     except Exception:
@@ -52,107 +64,91 @@ def parse_hhmm(s):
 
 def parse_date(s):
     """ממיר 'DD/MM/YYYY' ל- date."""
+    # מסלול מהיר בפירוק ידני; כל צורה אחרת (וגם שגיאות) עוברת ל-strptime
+    parts = s.split("/")
+    if len(parts) == 3 and all(x.isascii() and x.isdigit() for x in parts) \
+            and 0 < len(parts[0]) <= 2 and 0 < len(parts[1]) <= 2 and len(parts[2]) == 4:
+        try:
+            return date(int(parts[2]), int(parts[1]), int(parts[0]))
+        except ValueError:
+            pass
     return datetime.strptime(s, "%d/%m/%Y").date()
 
-def overlap_minutes(a_start, a_end, b_start, b_end):
-    """החזרת דקות החפיפה בין שני טווחי datetime."""
-    start = max(a_start, b_start)
-    end = min(a_end, b_end)
-    return max(0, int((end - start).total_seconds() // 60))
-
-def daily_interval(date_obj, t_start, t_end):
-    """בונה טווח datetime יומי בין שתי שעות לאותה 'תאריך' (אם t_end < t_start חוצים חצות)."""
-    start = datetime.combine(date_obj, t_start)
-    end = datetime.combine(date_obj, t_end)
-    if t_end <= t_start:
-        end += timedelta(days=1)
-    return start, end
-
-def is_holiday(status_text):
-    if not isinstance(status_text, str):
-        return False
-    return any(h in status_text for h in HOLIDAY_HINTS)
-
-def is_sick(status_text):
-    if not isinstance(status_text, str):
-        return False
-    return SICK_KEYWORD in status_text
-
-def is_no_attendance(status_text):
+def classify_status(status_text):
+    """
+    סיווג סטטוס בבדיקה אחת: (אין דיווח נוכחות, חג, מחלה).
+    ערך שאינו מחרוזת – אף סיווג.
+    """
     if not isinstance(status_text, str):
-        return False
-    return NO_ATTENDANCE_KEYWORD in status_text
+        return False, False, False
+    return (NO_ATTENDANCE_KEYWORD in status_text,
+            HOLIDAY_RE.search(status_text) is not None,
+            SICK_KEYWORD in status_text)
 
 
 # ===== חישובי תוספות לפי חלונות זמן =====
-def compute_evening_minutes(start_dt, end_dt):
+# כל הפונקציות כאן מקבלות מערכי numpy של תחילת/סוף משמרת בדקות מאז 1970-01-01 00:00
+# (יום חמישי), ומחזירות מערך דקות חפיפה – חישוב אחד לכל המשמרות יחד.
+# כל חלון חוזר במחזור קבוע (יום/שבוע), ולכן החפיפה מחושבת בנוסחה סגורה – בלי לולאה על ימים.
+def _windowed_upto(x, offset, length, period):
+    """
+    כמה דקות מתוך [0, x) נופלות בחלון מחזורי [offset, offset+length) שחוזר כל period דקות.
+    חפיפה של משמרת עם החלון = _windowed_upto(end) - _windowed_upto(start), ללא לולאה על מחזורים.
+    """
+    return x // period * length + np.clip(x % period - offset, 0, length)
+
+def compute_evening_minutes(start_min, end_min):
     """
     דקות בערב (16:00–24:00) – מסתכל גם אם חצינו חצות.
-    נחלק לפי ימים קלנדריים ונחשב חפיפה מול חלון הערב בכל יום.
+    חלון יומי: מתחיל 16*60 דקות אחרי חצות ואורכו 8 שעות.
     """
-    total = 0
-    cur = start_dt
-    while cur < end_dt:
-        day = cur.date()
-        eve_start, eve_end = daily_interval(day, time(16, 0), time(0, 0))  # עד חצות
-        total += overlap_minutes(start_dt, end_dt, eve_start, eve_end)
-        cur = datetime.combine(day, time(0, 0)) + timedelta(days=1)
-    return total
-
-def compute_night_minutes(start_dt, end_dt):
+    offset, length = 16 * 60, 8 * 60
+    return (_windowed_upto(end_min, offset, length, 1440)
+            - _windowed_upto(start_min, offset, length, 1440))
+
+def compute_night_minutes(start_min, end_min):
     """
-    דקות בלילה (24:00–07:30). נעשה שני חלונות לכל יום: 00:00–07:30 של אותו יום.
+    דקות בלילה (24:00–07:30). חלון יומי 00:00–07:30.
     שים לב: "24:00–07:30" זהה ל- 00:00–07:30 של היום הבא.
     """
-    total = 0
-    cur = start_dt
-    while cur < end_dt:
-        day = cur.date()
-        night_start = datetime.combine(day, time(0, 0))
-        night_end = datetime.combine(day, time(7, 30))
-        total += overlap_minutes(start_dt, end_dt, night_start, night_end)
-        cur = datetime.combine(day, time(0, 0)) + timedelta(days=1)
-    return total
-
-def iter_weekend_windows(around_start, around_end):
+    offset, length = 0, 7 * 60 + 30
+    return (_windowed_upto(end_min, offset, length, 1440)
+            - _windowed_upto(start_min, offset, length, 1440))
+
+def compute_weekend_minutes(start_min, end_min):
     """
-    יוצר חלונות סוף שבוע: שישי 16:00 → ראשון 07:30 עבור כל שבוע שעשוי לחפוף.
-    נזוז קצת אחורה וקדימה כדי לכסות חציית שבוע.
+    דקות סוף שבוע: שישי 16:00 → ראשון 07:30.
+    חלון שבועי קבוע: שישי 16:00 נמצא 1440+960 דקות אחרי חמישי 1970-01-01 00:00, ואורכו 39:30 שעות.
     """
-    # נתחיל משני ימים לפני תחילת הטווח ועד שני ימים אחרי סופו
-    window_start = (around_start - timedelta(days=3)).date()
-    window_end = (around_end + timedelta(days=3)).date()
-
-    d = window_start
-    while d <= window_end:
-        # מצא את שישי של אותו שבוע (weekday(): Mon=0..Sun=6, Fri=4)
-        offset_to_fri = (4 - d.weekday()) % 7
-        fri = d + timedelta(days=offset_to_fri)
-        fri_16 = datetime.combine(fri, time(16, 0))
-        # "סוף משמרת לילה של שבת" = 24:00 שבת עד 07:30 ראשון (כלומר ראשון 07:30)
-        sun = fri + timedelta(days=2)  # שישי+2=ראשון
-        sun_0730 = datetime.combine(sun, time(7, 30))
-        yield fri_16, sun_0730
-        d += timedelta(days=7)
-
-def compute_weekend_minutes(start_dt, end_dt):
-    total = 0
-    for w_start, w_end in iter_weekend_windows(start_dt, end_dt):
-        total += overlap_minutes(start_dt, end_dt, w_start, w_end)
-    return total
+    offset, length = 1440 + 16 * 60, 39 * 60 + 30
+    return (_windowed_upto(end_min, offset, length, 7 * 1440)
+            - _windowed_upto(start_min, offset, length, 7 * 1440))
 
 
 # ===== קריאת הקלט וחישוב השכר =====
+REQUIRED_COLUMNS = ["שעת כניסה", "שעת יציאה", "סה\"כ נוכחות", "סטטוס/הערות", "יום בשבוע", "תאריך"]
+
 def load_attendance(csv_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(
-        csv_path,
-        encoding="utf-8-sig",
-        dtype=str,                 # חשוב: הכל כמחרוזות
-        keep_default_na=False,     # לא להפוך מחרוזות ריקות ל-NaN
-        na_values=[]               # לא לסמן ערכים כ-NaN אוטומטית
-    )
+    if pa is not None:
+        # קריאה ב-pyarrow לעמודות מחרוזת של Arrow. הטיפוסים נקבעים במפורש כמחרוזת –
+        # אחרת pyarrow מזהה 'HH:MM' כשעה ומחזיר '08:48:00'. מחרוזת ריקה נשארת ריקה
+        # (strings_can_be_null=False כברירת מחדל), וה-BOM של utf-8-sig מדולג.
+        table = pa_csv.read_csv(
+            csv_path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(column_types={c: pa.string() for c in REQUIRED_COLUMNS}),
+        )
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        df = pd.read_csv(
+            csv_path,
+            encoding="utf-8-sig",
+            dtype=str,                 # חשוב: הכל כמחרוזות
+            keep_default_na=False,     # לא להפוך מחרוזות ריקות ל-NaN
+            na_values=[]               # לא לסמן ערכים כ-NaN אוטומטית
+        )
     # וידוא עמודות
-    for col in ["שעת כניסה", "שעת יציאה", "סה\"כ נוכחות", "סטטוס/הערות", "יום בשבוע", "תאריך"]:
+    for col in REQUIRED_COLUMNS:
         if col not in df.columns:
             raise ValueError(f"עמודה חסרה בקובץ: {col}")
     return df
@@ -162,37 +158,33 @@ def compute_daily_rows(df):
     """
     מחזיר DataFrame מפורט ליום: זמנים, דקות לפי סוג (רגיל/ערב/לילה/סופ"ש/חג), ותשלומים.
     """
-    rows = []
-    for _, r in df.iterrows():
-        status = str(r["סטטוס/הערות"] or "").strip()
-        if is_no_attendance(status):
-            # מתעלמים מיום ללא עבודה
-            continue
-
-        date = parse_date(str(r["תאריך"]))
-        t_in = parse_hhmm(r["שעת כניסה"])
-        t_out = parse_hhmm(r["שעת יציאה"])
+    # עמודות הפלט בסדר קבוע; כל שורה נרשמת כ-tuple באותו סדר
+    columns = ["תאריך", "סטטוס/הערות", "is_sick", "holiday", "start", "end",
+               "minutes_total", "minutes_evening", "minutes_night", "minutes_weekend",
+               "minutes_holiday", "worked_day"]
+    pos = {name: i for i, name in enumerate(df.columns)}
+    i_date = pos["תאריך"]
+    i_in, i_out = pos["שעת כניסה"], pos["שעת יציאה"]
+
+    # סיווג הסטטוסים לכל השורות יחד (חיפוש תת-מחרוזת וקטורי), לפני הלולאה
+    statuses = df["סטטוס/הערות"].fillna("").astype(str).str.strip()
+    # מתעלמים מיום ללא עבודה
+    keep = ~statuses.str.contains(NO_ATTENDANCE_KEYWORD, regex=False).to_numpy(dtype=bool)
+    statuses = statuses[keep]
+    holiday_flags = statuses.str.contains(HOLIDAY_RE).to_numpy(dtype=bool)  # זיהוי חג
+    sick_flags = statuses.str.contains(SICK_KEYWORD, regex=False).to_numpy(dtype=bool)
 
-        # זיהוי חג
-        holiday_flag = is_holiday(status)
-        sick_flag = is_sick(status)
+    rows = []
+    for r, status, holiday_flag, sick_flag in zip(df[keep].itertuples(index=False, name=None),
+                                                  statuses.tolist(), holiday_flags.tolist(),
+                                                  sick_flags.tolist()):
+        date = parse_date(str(r[i_date]))
+        t_in = parse_hhmm(r[i_in])
+        t_out = parse_hhmm(r[i_out])
 
         if sick_flag:
             # נחשב בפונקציה נפרדת, אבל נרשום שורה ריקה לשעות עבודה
-            rows.append({
-                "תאריך": date,
-                "סטטוס/הערות": status,
-                "is_sick": True,
-                "holiday": holiday_flag,
-                "start": None,
-                "end": None,
-                "minutes_total": 0,
-                "minutes_evening": 0,
-                "minutes_night": 0,
-                "minutes_weekend": 0,
-                "minutes_holiday": 0,
-                "worked_day": False
-            })
+            rows.append((date, status, True, holiday_flag, None, None, 0, 0, 0, 0, 0, False))
             continue
 
         # אם אין זמנים, אין עבודה ואין נסיעות
@@ -208,49 +200,44 @@ def compute_daily_rows(df):
         if minutes_total <= 0:
             continue
 
-        minutes_evening = compute_evening_minutes(start, end)
-        minutes_night = compute_night_minutes(start, end)
-        minutes_weekend = compute_weekend_minutes(start, end)
         minutes_holiday = 0
         if holiday_flag:
             minutes_holiday = minutes_total  # תוספת 50% לכל הדקות ביום חג/ערב חג (פשטני, אפשר לשכלל)
 
-        rows.append({
-            "תאריך": date,
-            "סטטוס/הערות": status,
-            "is_sick": False,
-            "holiday": holiday_flag,
-            "start": start,
-            "end": end,
-            "minutes_total": minutes_total,
-            "minutes_evening": minutes_evening,
-            "minutes_night": minutes_night,
-            "minutes_weekend": minutes_weekend,
-            "minutes_holiday": minutes_holiday,
-            "worked_day": True
-        })
-    out = pd.DataFrame(rows).sort_values("תאריך").reset_index(drop=True)
+        # דקות ערב/לילה/סופ"ש (0 כאן) ימולאו למטה בחישוב וקטורי אחד לכל המשמרות
+        rows.append((date, status, False, holiday_flag, start, end,
+                     minutes_total, 0, 0, 0, minutes_holiday, True))
+    out = pd.DataFrame.from_records(rows, columns=columns)
+
+    # דקות ערב/לילה/סופ"ש לכל ימי העבודה יחד (דקות מאז 1970-01-01)
+    worked = out["worked_day"].to_numpy(dtype=bool)
+    if worked.any():
+        start_min = pd.to_datetime(out.loc[worked, "start"]).to_numpy().astype("datetime64[m]").astype(np.int64)
+        end_min = pd.to_datetime(out.loc[worked, "end"]).to_numpy().astype("datetime64[m]").astype(np.int64)
+        out.loc[worked, "minutes_evening"] = compute_evening_minutes(start_min, end_min)
+        out.loc[worked, "minutes_night"] = compute_night_minutes(start_min, end_min)
+        out.loc[worked, "minutes_weekend"] = compute_weekend_minutes(start_min, end_min)
+
+    out = out.sort_values("תאריך").reset_index(drop=True)
     return out
 
-def minutes_to_hours(mins):
-    return mins / 60.0
-
-def add_pay_columns(daily_df: pd.DataFrame):
+def add_pay_columns(daily_df: pd.DataFrame, *, copy: bool = False):
     """
     מחשב תשלום לכל יום (שכר בסיס + תוספות), כולל נסיעות.
     תוספות נערמות (מצטברות) כאשר שעות חופפות לכמה חלונות (למשל שישי 18:00 = ערב+סופ"ש).
+    העמודות נוספות על daily_df עצמה; copy=True משאיר את הקלט ללא שינוי.
     """
-    df = daily_df.copy()
+    df = daily_df.copy() if copy else daily_df
 
     # בסיס לשעה:
     base_rate = HOURLY_WAGE
 
     # שעות (שעות = דקות/60)
-    df["hours_total"]   = df["minutes_total"].apply(minutes_to_hours)
-    df["hours_evening"] = df["minutes_evening"].apply(minutes_to_hours)
-    df["hours_night"]   = df["minutes_night"].apply(minutes_to_hours)
-    df["hours_weekend"] = df["minutes_weekend"].apply(minutes_to_hours)
-    df["hours_holiday"] = df["minutes_holiday"].apply(minutes_to_hours)
+    df["hours_total"]   = df["minutes_total"] / 60.0
+    df["hours_evening"] = df["minutes_evening"] / 60.0
+    df["hours_night"]   = df["minutes_night"] / 60.0
+    df["hours_weekend"] = df["minutes_weekend"] / 60.0
+    df["hours_holiday"] = df["minutes_holiday"] / 60.0
 
     # שכר בסיס (ללא תוספות): כל הדקות עולות שכר בסיס
     df["pay_base"] = df["hours_total"] * base_rate
@@ -263,7 +250,7 @@ def add_pay_columns(daily_df: pd.DataFrame):
     df["pay_holiday_bonus"] = df["hours_holiday"] * base_rate * HOLIDAY_BONUS
 
     # נסיעות: רק אם יום עבודה (לא מחלה), ויש שעות בפועל
-    df["travel_pay"] = df["worked_day"].apply(lambda w: DAILY_TRAVEL if w else 0.0)
+    df["travel_pay"] = np.where(df["worked_day"].astype(bool), DAILY_TRAVEL, 0.0)
     df.loc[df["hours_total"] <= 0, "travel_pay"] = 0.0
 
     # סיכום ליום
@@ -278,13 +265,14 @@ def add_pay_columns(daily_df: pd.DataFrame):
 
     return df
 
-def add_sick_pay(daily_df: pd.DataFrame, original_selected_csv: pd.DataFrame):
+def add_sick_pay(daily_df: pd.DataFrame, original_selected_csv: pd.DataFrame, *, copy: bool = False):
     """
     מחשב שכר לימי מחלה לפי החוק, על בסיס רצפים של "מחלה".
     הנחה: שעות יומיות למחלה = ממוצע שעות עבודה אמיתי באותו חודש (אם USE_AVG_HOURS_FOR_SICK)
     אחרת, משתמשים ב-DEFAULT_DAILY_SICK_HOURS.
+    העדכונים נעשים על daily_df עצמה; copy=True משאיר את הקלט ללא שינוי.
     """
-    df = daily_df.copy()
+    df = daily_df.copy() if copy else daily_df
 
     # ממוצע שעות עבודה יומי אמיתי (רק בימים שעבדת)
     avg_hours = DEFAULT_DAILY_SICK_HOURS
@@ -295,10 +283,10 @@ def add_sick_pay(daily_df: pd.DataFrame, original_selected_csv: pd.DataFrame):
 
     # נאתר את כל התאריכים שהוגדר בהם "מחלה" בקובץ המקורי (גם אם סוננו קודם)
     sick_dates = []
-    for _, r in original_selected_csv.iterrows():
-        status = str(r["סטטוס/הערות"] or "").strip()
-        if is_sick(status) and not is_no_attendance(status):
-            sick_dates.append(parse_date(str(r["תאריך"])))
+    for status, d in zip(original_selected_csv["סטטוס/הערות"].tolist(), original_selected_csv["תאריך"].tolist()):
+        no_att, _, sick = classify_status(str(status or "").strip())
+        if sick and not no_att:
+            sick_dates.append(parse_date(str(d)))
 
     if not sick_dates:
         df["pay_sick"] = 0.0
@@ -306,77 +294,62 @@ def add_sick_pay(daily_df: pd.DataFrame, original_selected_csv: pd.DataFrame):
 
     sick_dates = sorted(set(sick_dates))
 
-    # נעבור בתאריכים עוקבים, ונחשב רצפים
-    pay_sick_map = {}  # date -> sick pay
-    i = 0
-    while i < len(sick_dates):
-        # התחל רצף חדש
-        start_idx = i
-        cur = sick_dates[i]
-        j = i + 1
-        while j < len(sick_dates) and (sick_dates[j] - sick_dates[j-1]).days == 1:
-            j += 1
-        # רצף = sick_dates[start_idx:j]
-        seq = sick_dates[start_idx:j]
-
-        # חישוב לפי חוק:
-        # יום 1: 0%
-        # יום 2-3: 50%
-        # יום 4+: 100%
-        for k, d in enumerate(seq, start=1):
-            if k == 1:
-                pct = 0.0
-            elif k in (2, 3):
-                pct = 0.5
-            else:
-                pct = 1.0
-            pay_sick_map[d] = avg_hours * HOURLY_WAGE * pct
-
-        i = j
-
-    # הוספה לטבלת הימים:
-    df["pay_sick"] = 0.0
-    # נוודא שלא נספר ימי מחלה שכבר יש בהם עבודה בפועל (בדרך כלל לא צריך לשלב)
-    for d, pay in pay_sick_map.items():
-        if d in df["תאריך"].values:
-            # אם קיים יום כזה כבר (עבודה/אחר), נעדכן עמודה נפרדת
-            df.loc[df["תאריך"] == d, "pay_sick"] = pay
-            # אם באותו יום יש גם עבודה בפועל, לפי מדיניות אפשר לבחור אחד.
-            # כאן נשאיר את שניהם, ובסיכום נחליט. ברירת מחדל: לא מצטבר.
-            # כדי לא לצבור, נוכל לאפס עבודה באותו יום:
-            if df.loc[df["תאריך"] == d, "worked_day"].any():
-                # לא לצבור: נבטל עבודה ונשאיר מחלה
-                df.loc[df["תאריך"] == d, ["pay_base","pay_evening_bonus","pay_night_bonus",
-                                           "pay_weekend_bonus","pay_holiday_bonus","travel_pay","pay_total_day"]] = 0.0
-        else:
-            # הוסף שורה חדשה עבור יום מחלה שלא הופיע ברשימת ימי עבודה
-            df = pd.concat([df, pd.DataFrame([{
-                "תאריך": d,
-                "סטטוס/הערות": "מחלה",
-                "is_sick": True,
-                "holiday": False,
-                "start": None,
-                "end": None,
-                "minutes_total": 0,
-                "minutes_evening": 0,
-                "minutes_night": 0,
-                "minutes_weekend": 0,
-                "minutes_holiday": 0,
-                "worked_day": False,
-                "hours_total": 0.0,
-                "hours_evening": 0.0,
-                "hours_night": 0.0,
-                "hours_weekend": 0.0,
-                "hours_holiday": 0.0,
-                "pay_base": 0.0,
-                "pay_evening_bonus": 0.0,
-                "pay_night_bonus": 0.0,
-                "pay_weekend_bonus": 0.0,
-                "pay_holiday_bonus": 0.0,
-                "travel_pay": 0.0,
-                "pay_total_day": 0.0,
-                "pay_sick": pay
-            }])], ignore_index=True)
+    # רצפים של ימים עוקבים: שבירה בכל מקום שהפער בין תאריכים סמוכים אינו יום אחד
+    ords = np.array([d.toordinal() for d in sick_dates], dtype=np.int64)
+    breaks = np.flatnonzero(np.diff(ords) != 1) + 1
+    run_start = np.zeros(len(ords), dtype=np.int64)
+    run_start[breaks] = breaks
+    k = np.arange(len(ords)) - np.maximum.accumulate(run_start) + 1  # מספר היום בתוך הרצף
+
+    # חישוב לפי חוק (SICK_DAY_PCT):
+    # יום 1: 0%
+    # יום 2-3: 50%
+    # יום 4+: 100%
+    pct = SICK_DAY_PCT[np.minimum(k, len(SICK_DAY_PCT)) - 1]
+    pay_sick_map = dict(zip(sick_dates, (avg_hours * HOURLY_WAGE * pct).tolist()))  # date -> sick pay
+
+    # הוספה לטבלת הימים – התאמה אחת לפי תאריך במקום סריקה של כל הטבלה לכל יום מחלה
+    pay_by_row = df["תאריך"].map(pay_sick_map)
+    matched = pay_by_row.notna()
+    df["pay_sick"] = pay_by_row.where(matched, 0.0).astype(float)
+    # אם באותו יום יש גם עבודה בפועל, לפי מדיניות אפשר לבחור אחד. ברירת מחדל: לא מצטבר –
+    # נבטל עבודה ונשאיר מחלה (בכל השורות של אותו תאריך)
+    worked_sick_dates = set(df.loc[matched & df["worked_day"], "תאריך"])
+    if worked_sick_dates:
+        df.loc[df["תאריך"].isin(worked_sick_dates), ["pay_base","pay_evening_bonus","pay_night_bonus",
+                                                      "pay_weekend_bonus","pay_holiday_bonus","travel_pay","pay_total_day"]] = 0.0
+
+    # ימי מחלה שלא הופיעו ברשימת ימי העבודה – שורות חדשות, נאספות לרשימה ומחוברות פעם אחת
+    present = set(df.loc[matched, "תאריך"])
+    new_rows = [{
+        "תאריך": d,
+        "סטטוס/הערות": "מחלה",
+        "is_sick": True,
+        "holiday": False,
+        "start": None,
+        "end": None,
+        "minutes_total": 0,
+        "minutes_evening": 0,
+        "minutes_night": 0,
+        "minutes_weekend": 0,
+        "minutes_holiday": 0,
+        "worked_day": False,
+        "hours_total": 0.0,
+        "hours_evening": 0.0,
+        "hours_night": 0.0,
+        "hours_weekend": 0.0,
+        "hours_holiday": 0.0,
+        "pay_base": 0.0,
+        "pay_evening_bonus": 0.0,
+        "pay_night_bonus": 0.0,
+        "pay_weekend_bonus": 0.0,
+        "pay_holiday_bonus": 0.0,
+        "travel_pay": 0.0,
+        "pay_total_day": 0.0,
+        "pay_sick": pay
+    } for d, pay in pay_sick_map.items() if d not in present]
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
 
     df = df.sort_values("תאריך").reset_index(drop=True)
     return df
@@ -1,11 +1,17 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta, time
 from pathlib import Path
-import math
 import json
+import re
+
+try:  # pyarrow אופציונלי – בלעדיו הקריאה נעשית במנוע של pandas
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
 
 # ===== פרמטרים כלליים =====
 HOURLY_WAGE = 65.0          # ש"ח לשעה
@@ -28,11 +34,14 @@ DAILY_T1_HOURS      = 2.0     # שעתיים ראשונות בדרגה 1 (125%)
 # ===== ימי מחלה =====
 USE_AVG_HOURS_FOR_SICK   = True
 DEFAULT_DAILY_SICK_HOURS = 8.0
+# אחוז תשלום לפי מספר היום ברצף מחלה (האיבר האחרון חל על יום 4 ואילך)
+SICK_DAY_PCT = np.array([0.0, 0.5, 0.5, 1.0])
 
 # ===== מילות מפתח לסטטוסים =====
 SICK_KEYWORD          = "מחלה"
 NO_ATTENDANCE_KEYWORD = "אין דיווח נוכחות"
 HOLIDAY_HINTS         = ["חג", "ערב חג"]
+HOLIDAY_RE            = re.compile("|".join(map(re.escape, HOLIDAY_HINTS)))
 
 # ===== ניכויים לנטו =====
 CREDIT_POINTS        = 2.25            # נקודות זיכוי למס הכנסה
@@ -46,6 +55,11 @@ TAX_BRACKETS = [
     (45180,  0.35),
     (float("inf"), 0.47),
 ]
+# אותן מדרגות כמערכים: תקרה, גבול תחתון ושיעור לכל מדרגה, ומס מצטבר עד תחילת כל מדרגה
+TAX_CAPS   = np.array([cap for cap, _ in TAX_BRACKETS])
+TAX_RATES  = np.array([rate for _, rate in TAX_BRACKETS])
+TAX_LOWERS = np.concatenate([[0.0], TAX_CAPS[:-1]])
+TAX_PREFIX = np.concatenate([[0.0], np.cumsum((TAX_CAPS - TAX_LOWERS)[:-1] * TAX_RATES[:-1])])
 # ביטוח לאומי/בריאות (בקירוב; ניתן לעדכון)
 NI_THRESHOLD = 7570.0
 NI_LOW   = 0.004
@@ -59,173 +73,135 @@ EMPLOYEE_PENSION_RATE = 0.07
 PENSION_BASE_MODE = "wage_only"   # "wage_only" / "include_all"
 
 
-# ===== כלים לזמן =====
-def parse_hhmm(s):
-    """ממיר 'HH:MM' ל-time או None."""
-    if s is None:
-        return None
-    if isinstance(s, float) and math.isnan(s):
-        return None
-    s = str(s).strip()
-    if not s or s in {".", "-"}:
-        return None
-    try:
-        return datetime.strptime(s, "%H:%M").time()
-    except Exception:
-        return None
-
-def parse_date(s):
-    return datetime.strptime(s, "%d/%m/%Y").date()
-
-def overlap_minutes(a_start, a_end, b_start, b_end):
-    start = max(a_start, b_start)
-    end   = min(a_end, b_end)
-    return max(0, int((end - start).total_seconds() // 60))
-
-def daily_interval(date_obj, t_start, t_end):
-    start = datetime.combine(date_obj, t_start)
-    end   = datetime.combine(date_obj, t_end)
-    if t_end <= t_start:
-        end += timedelta(days=1)
-    return start, end
-
-def is_holiday(status_text):
-    if not isinstance(status_text, str):
-        return False
-    return any(h in status_text for h in HOLIDAY_HINTS)
-
-def is_sick(status_text):
-    if not isinstance(status_text, str):
-        return False
-    return SICK_KEYWORD in status_text
-
-def is_no_attendance(status_text):
-    if not isinstance(status_text, str):
-        return False
-    return NO_ATTENDANCE_KEYWORD in status_text
-
-
 # ===== חלונות זמן =====
-def compute_evening_minutes(start_dt, end_dt):
-    total = 0
-    cur = start_dt
-    while cur < end_dt:
-        day = cur.date()
-        eve_start, eve_end = daily_interval(day, time(16, 0), time(0, 0))
-        total += overlap_minutes(start_dt, end_dt, eve_start, eve_end)
-        cur = datetime.combine(day, time(0, 0)) + timedelta(days=1)
-    return total
-
-def compute_night_minutes(start_dt, end_dt):
-    total = 0
-    cur = start_dt
-    while cur < end_dt:
-        day = cur.date()
-        night_start = datetime.combine(day, time(0, 0))
-        night_end   = datetime.combine(day, time(7, 30))
-        total += overlap_minutes(start_dt, end_dt, night_start, night_end)
-        cur = datetime.combine(day, time(0, 0)) + timedelta(days=1)
-    return total
-
-def iter_weekend_windows(around_start, around_end):
-    window_start = (around_start - timedelta(days=3)).date()
-    window_end   = (around_end   + timedelta(days=3)).date()
-    d = window_start
-    while d <= window_end:
-        offset_to_fri = (4 - d.weekday()) % 7  # Fri=4
-        fri = d + timedelta(days=offset_to_fri)
-        fri_16 = datetime.combine(fri, time(16, 0))
-        sun = fri + timedelta(days=2)
-        sun_0730 = datetime.combine(sun, time(7, 30))
-        yield fri_16, sun_0730
-        d += timedelta(days=7)
-
-def compute_weekend_minutes(start_dt, end_dt):
-    total = 0
-    for w_start, w_end in iter_weekend_windows(start_dt, end_dt):
-        total += overlap_minutes(start_dt, end_dt, w_start, w_end)
-    return total
+# הפונקציות מקבלות מערכי numpy של תחילת/סוף משמרת בדקות מאז 1970-01-01 00:00 (יום חמישי)
+# ומחזירות מערך דקות חפיפה לכל המשמרות יחד. כל חלון חוזר במחזור קבוע (יום/שבוע),
+# ולכן החפיפה מחושבת בנוסחה סגורה – בלי לולאה על ימים או על חלונות.
+DAY_MIN, WEEK_MIN = 1440, 7 * 1440
+# טבלת החלונות, נקבעת פעם אחת בטעינה: (היסט מתחילת המחזור, אורך, מחזור) בדקות
+EVENING_WINDOW = (16 * 60, 8 * 60, DAY_MIN)                  # 16:00–24:00
+NIGHT_WINDOW   = (0, 7 * 60 + 30, DAY_MIN)                   # 00:00–07:30
+WEEKEND_WINDOW = (DAY_MIN + 16 * 60, 39 * 60 + 30, WEEK_MIN)  # שישי 16:00 → ראשון 07:30
+
+def _windowed_upto(x, offset, length, period):
+    """
+    כמה דקות מתוך [0, x) נופלות בחלון מחזורי [offset, offset+length) שחוזר כל period דקות.
+    חפיפה של משמרת עם החלון = _windowed_upto(end) - _windowed_upto(start).
+    """
+    return x // period * length + np.clip(x % period - offset, 0, length)
+
+def _window_minutes(start_min, end_min, window):
+    """דקות החפיפה של כל משמרת עם חלון מהטבלה."""
+    return _windowed_upto(end_min, *window) - _windowed_upto(start_min, *window)
+
+def compute_evening_minutes(start_min, end_min):
+    """דקות בערב: 16:00–24:00 בכל יום."""
+    return _window_minutes(start_min, end_min, EVENING_WINDOW)
+
+def compute_night_minutes(start_min, end_min):
+    """דקות בלילה: 00:00–07:30 בכל יום."""
+    return _window_minutes(start_min, end_min, NIGHT_WINDOW)
+
+def compute_weekend_minutes(start_min, end_min):
+    """דקות סוף שבוע: שישי 16:00 → ראשון 07:30 (שישי 16:00 = 1440+960 דקות אחרי חמישי 00:00)."""
+    return _window_minutes(start_min, end_min, WEEKEND_WINDOW)
 
 
 # ===== קריאת הקלט וחישובי ברוטו =====
+REQUIRED_COLUMNS = ["שעת כניסה", "שעת יציאה", "סה\"כ נוכחות", "סטטוס/הערות", "יום בשבוע", "תאריך"]
+
 def load_attendance(csv_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(csv_path, encoding="utf-8-sig", dtype=str, keep_default_na=False, na_values=[])
-    for col in ["שעת כניסה", "שעת יציאה", "סה\"כ נוכחות", "סטטוס/הערות", "יום בשבוע", "תאריך"]:
+    if pa is not None:
+        # עמודות מחרוזת של Arrow; הטיפוסים נקבעים במפורש כמחרוזת (אחרת 'HH:MM' מזוהה כשעה),
+        # מחרוזת ריקה נשארת ריקה וה-BOM של utf-8-sig מדולג – כמו ב-compute_pay.py
+        table = pa_csv.read_csv(
+            csv_path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(column_types={c: pa.string() for c in REQUIRED_COLUMNS}),
+        )
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        df = pd.read_csv(csv_path, encoding="utf-8-sig", dtype=str, keep_default_na=False, na_values=[])
+    for col in REQUIRED_COLUMNS:
         if col not in df.columns:
             raise ValueError(f"עמודה חסרה בקובץ: {col}")
+    # ערכים חוזרים (ימים/סטטוסים) כקטגוריות – פעולות .str רצות פעם אחת לכל ערך שונה
+    df["יום בשבוע"] = df["יום בשבוע"].astype("category")
+    df["סטטוס/הערות"] = df["סטטוס/הערות"].str.strip().astype("category")
     return df
 
+def clean_status(col: pd.Series) -> pd.Series:
+    """עמודת סטטוס ללא רווחים בקצוות; עמודה קטגוריאלית (מ-load_attendance) כבר מנוקה ונשארת כמות שהיא."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col
+    return col.fillna("").astype(str).str.strip()
+
+def hhmm_offset(col: pd.Series) -> pd.Series:
+    """עמודת 'HH:MM' -> היסט מחצות (Timedelta), NaT לערך ריק/לא תקין ('.', '-' וכו'), לכל העמודה."""
+    t = pd.to_datetime(col.astype(str).str.strip(), format="%H:%M", errors="coerce")
+    return t - t.dt.normalize()
+
 def compute_daily_rows(df):
-    rows = []
-    for _, r in df.iterrows():
-        status = str(r["סטטוס/הערות"] or "").strip()
-        if is_no_attendance(status):
-            continue
-
-        date = parse_date(str(r["תאריך"]))
-        t_in  = parse_hhmm(r["שעת כניסה"])
-        t_out = parse_hhmm(r["שעת יציאה"])
-        holiday_flag = is_holiday(status)
-        sick_flag    = is_sick(status)
-
-        if sick_flag:
-            rows.append({
-                "תאריך": date,
-                "סטטוס/הערות": status,
-                "is_sick": True,
-                "holiday": holiday_flag,
-                "start": None, "end": None,
-                "minutes_total": 0, "minutes_evening": 0, "minutes_night": 0,
-                "minutes_weekend": 0, "minutes_holiday": 0,
-                "worked_day": False
-            })
-            continue
-
-        if not t_in or not t_out:
-            continue
-
-        start = datetime.combine(date, t_in)
-        end   = datetime.combine(date, t_out)
-        if end <= start:
-            end += timedelta(days=1)  # חציית חצות
-
-        minutes_total = int((end - start).total_seconds() // 60)
-        if minutes_total <= 0:
-            continue
-
-        minutes_evening = compute_evening_minutes(start, end)
-        minutes_night   = compute_night_minutes(start, end)
-        minutes_weekend = compute_weekend_minutes(start, end)
-        minutes_holiday = minutes_total if holiday_flag else 0
-
-        rows.append({
-            "תאריך": date,
-            "סטטוס/הערות": status,
-            "is_sick": False,
-            "holiday": holiday_flag,
-            "start": start, "end": end,
-            "minutes_total": minutes_total,
-            "minutes_evening": minutes_evening,
-            "minutes_night": minutes_night,
-            "minutes_weekend": minutes_weekend,
-            "minutes_holiday": minutes_holiday,
-            "worked_day": True
-        })
-
-    out = pd.DataFrame(rows).sort_values("תאריך").reset_index(drop=True)
+    # סיווג הסטטוסים לכל השורות יחד; ימים ללא דיווח נוכחות מסוננים מראש
+    status = clean_status(df["סטטוס/הערות"])
+    keep = ~status.str.contains(NO_ATTENDANCE_KEYWORD, regex=False).to_numpy(dtype=bool)
+    df, status = df[keep], status[keep]
+    holiday = status.str.contains(HOLIDAY_RE).to_numpy(dtype=bool)
+    sick = status.str.contains(SICK_KEYWORD, regex=False).to_numpy(dtype=bool)
+
+    # פענוח וקטורי של תאריכים ושעות
+    dates = pd.to_datetime(df["תאריך"].astype(str), format="%d/%m/%Y", cache=True)  # תאריכים חוזרים מפוענחים פעם אחת
+    t_in = hhmm_offset(df["שעת כניסה"])
+    t_out = hhmm_offset(df["שעת יציאה"])
+
+    # יום מחלה נרשם תמיד (בלי שעות); יום עבודה רק אם יש שעת כניסה ויציאה
+    worked = ~sick & t_in.notna().to_numpy() & t_out.notna().to_numpy()
+    rows = sick | worked
+    worked, holiday = worked[rows], holiday[rows]
+    start = (dates + t_in)[rows].where(worked)  # לימי מחלה אין שעות (NaT)
+    end = (dates + t_out)[rows].where(worked)
+    end = end.where(end > start, end + pd.Timedelta(days=1))  # חציית חצות
+
+    minutes_total = ((end - start) // pd.Timedelta(minutes=1)).fillna(0).to_numpy(dtype=np.int64)
+    # דקות ערב/לילה/סופ"ש לכל ימי העבודה יחד (דקות מאז 1970-01-01); לימי מחלה 0
+    start_min = start[worked].to_numpy().astype("datetime64[m]").astype(np.int64)
+    end_min = end[worked].to_numpy().astype("datetime64[m]").astype(np.int64)
+    minutes_evening = np.zeros(len(minutes_total), dtype=np.int64)
+    minutes_night = np.zeros(len(minutes_total), dtype=np.int64)
+    minutes_weekend = np.zeros(len(minutes_total), dtype=np.int64)
+    minutes_evening[worked] = compute_evening_minutes(start_min, end_min)
+    minutes_night[worked] = compute_night_minutes(start_min, end_min)
+    minutes_weekend[worked] = compute_weekend_minutes(start_min, end_min)
+
+    # הטבלה נבנית ישירות מהמערכים (בלי רשימת מילונים ובלי העתקה נוספת של כל עמודה)
+    out = pd.DataFrame({
+        "תאריך": dates[rows].dt.date.to_numpy(),
+        "סטטוס/הערות": status[rows].to_numpy(),
+        "is_sick": sick[rows],
+        "holiday": holiday,
+        "start": start.to_numpy(), "end": end.to_numpy(),
+        "minutes_total": minutes_total,
+        "minutes_evening": minutes_evening,
+        "minutes_night": minutes_night,
+        "minutes_weekend": minutes_weekend,
+        "minutes_holiday": np.where(holiday, minutes_total, 0),
+        "worked_day": worked,
+    }, copy=False)
+    out = out.sort_values("תאריך").reset_index(drop=True)
     return out
 
-def add_pay_columns(daily_df: pd.DataFrame):
-    """חישוב תשלומים ליום: בסיס + תוספות + שעות נוספות + נסיעות."""
-    df = daily_df.copy()
+def add_pay_columns(daily_df: pd.DataFrame, *, copy: bool = False):
+    """חישוב תשלומים ליום: בסיס + תוספות + שעות נוספות + נסיעות.
+    העמודות נוספות על daily_df עצמה; copy=True משאיר את הקלט ללא שינוי."""
+    df = daily_df.copy() if copy else daily_df
     base_rate = HOURLY_WAGE
 
     # המרת דקות לשעות
-    df["hours_total"]   = df["minutes_total"].apply(lambda m: m / 60.0)
-    df["hours_evening"] = df["minutes_evening"].apply(lambda m: m / 60.0)
-    df["hours_night"]   = df["minutes_night"].apply(lambda m: m / 60.0)
-    df["hours_weekend"] = df["minutes_weekend"].apply(lambda m: m / 60.0)
-    df["hours_holiday"] = df["minutes_holiday"].apply(lambda m: m / 60.0)
+    df["hours_total"]   = df["minutes_total"] / 60.0
+    df["hours_evening"] = df["minutes_evening"] / 60.0
+    df["hours_night"]   = df["minutes_night"] / 60.0
+    df["hours_weekend"] = df["minutes_weekend"] / 60.0
+    df["hours_holiday"] = df["minutes_holiday"] / 60.0
 
     # בסיס 100% לכל השעות
     df["pay_base"] = df["hours_total"] * base_rate
@@ -244,9 +220,9 @@ def add_pay_columns(daily_df: pd.DataFrame):
     df["pay_overtime_t1"] = df["hours_ot_t1"] * base_rate * OVERTIME_T1_BONUS  # +25%
     df["pay_overtime_t2"] = df["hours_ot_t2"] * base_rate * OVERTIME_T2_BONUS  # +50%
 
-    # נסיעות
-    df["travel_pay"] = df["worked_day"].apply(lambda w: DAILY_TRAVEL if w else 0.0)
-    df.loc[df["hours_total"] <= 0, "travel_pay"] = 0.0
+    # נסיעות: רק ביום עבודה עם שעות בפועל
+    df["travel_pay"] = np.where(df["worked_day"].to_numpy(dtype=bool) & (df["hours_total"].to_numpy() > 0),
+                                DAILY_TRAVEL, 0.0)
 
     # סיכום יומי כולל הכל (ללא ימי מחלה – נטפל בנפרד)
     df["pay_total_day"] = (
@@ -261,9 +237,10 @@ def add_pay_columns(daily_df: pd.DataFrame):
     )
     return df
 
-def add_sick_pay(daily_df: pd.DataFrame, original_selected_csv: pd.DataFrame):
-    """ימי מחלה לפי החוק: יום 1=0%, ימים 2–3=50%, מהיום 4=100%."""
-    df = daily_df.copy()
+def add_sick_pay(daily_df: pd.DataFrame, original_selected_csv: pd.DataFrame, *, copy: bool = False):
+    """ימי מחלה לפי החוק: יום 1=0%, ימים 2–3=50%, מהיום 4=100%.
+    העדכונים נעשים על daily_df עצמה; copy=True משאיר את הקלט ללא שינוי."""
+    df = daily_df.copy() if copy else daily_df
 
     avg_hours = DEFAULT_DAILY_SICK_HOURS
     if USE_AVG_HOURS_FOR_SICK:
@@ -272,11 +249,11 @@ def add_sick_pay(daily_df: pd.DataFrame, original_selected_csv: pd.DataFrame):
             avg_hours = worked_hours.mean()
 
     # זיהוי תאריכי מחלה מתוך קובץ המקור
-    sick_dates = []
-    for _, r in original_selected_csv.iterrows():
-        status = str(r["סטטוס/הערות"] or "").strip()
-        if is_sick(status) and not is_no_attendance(status):
-            sick_dates.append(parse_date(str(r["תאריך"])))
+    status = clean_status(original_selected_csv["סטטוס/הערות"])
+    sick_rows = (status.str.contains(SICK_KEYWORD, regex=False)
+                 & ~status.str.contains(NO_ATTENDANCE_KEYWORD, regex=False)).to_numpy(dtype=bool)
+    sick_dates = pd.to_datetime(original_selected_csv.loc[sick_rows, "תאריך"].astype(str),
+                                format="%d/%m/%Y", cache=True).dt.date.tolist()
 
     if not sick_dates:
         df["pay_sick"] = 0.0
@@ -284,53 +261,54 @@ def add_sick_pay(daily_df: pd.DataFrame, original_selected_csv: pd.DataFrame):
 
     sick_dates = sorted(set(sick_dates))
 
-    # פריסה לרצפים עוקבים
-    pay_sick_map = {}
-    i = 0
-    while i < len(sick_dates):
-        j = i + 1
-        while j < len(sick_dates) and (sick_dates[j] - sick_dates[j-1]).days == 1:
-            j += 1
-        seq = sick_dates[i:j]
-        # חישוב לפי חוק
-        for k, d in enumerate(seq, start=1):
-            if k == 1:
-                pct = 0.0
-            elif k in (2, 3):
-                pct = 0.5
-            else:
-                pct = 1.0
-            pay_sick_map[d] = avg_hours * HOURLY_WAGE * pct
-        i = j
+    # פריסה לרצפים עוקבים: שבירה בכל מקום שהפער בין תאריכים סמוכים אינו יום אחד
+    ords = np.array([d.toordinal() for d in sick_dates], dtype=np.int64)
+    breaks = np.flatnonzero(np.diff(ords) != 1) + 1
+    run_start = np.zeros(len(ords), dtype=np.int64)
+    run_start[breaks] = breaks
+    k = np.arange(len(ords)) - np.maximum.accumulate(run_start) + 1  # מספר היום בתוך הרצף
 
+    # חישוב לפי חוק: יום 1=0%, ימים 2–3=50%, מהיום 4=100% (SICK_DAY_PCT)
+    pct = SICK_DAY_PCT[np.minimum(k, len(SICK_DAY_PCT)) - 1]
+    pay_sick_map = dict(zip(sick_dates, (avg_hours * HOURLY_WAGE * pct).tolist()))
+
+    # לא לצבור עבודה+מחלה באותו יום: מבטלים רכיבי עבודה ומשאירים מחלה – מסכה אחת לכל ימי המחלה
     df["pay_sick"] = 0.0
-    for d, pay in pay_sick_map.items():
-        if d in df["תאריך"].values:
-            # לא לצבור עבודה+מחלה באותו יום: מבטלים רכיבי עבודה ומשאירים מחלה
-            df.loc[df["תאריך"] == d, [
-                "pay_base","pay_evening_bonus","pay_night_bonus","pay_weekend_bonus","pay_holiday_bonus",
-                "pay_overtime_t1","pay_overtime_t2","travel_pay","pay_total_day"
-            ]] = 0.0
-            df.loc[df["תאריך"] == d, "pay_sick"] = pay
-        else:
-            # יום מחלה שאינו מופיע בטבלה – הוסף שורה חדשה
-            df = pd.concat([df, pd.DataFrame([{
-                "תאריך": d, "סטטוס/הערות": "מחלה", "is_sick": True, "holiday": False,
-                "start": None, "end": None,
-                "minutes_total": 0, "minutes_evening": 0, "minutes_night": 0, "minutes_weekend": 0, "minutes_holiday": 0,
-                "worked_day": False,
-                "hours_total": 0.0, "hours_evening": 0.0, "hours_night": 0.0, "hours_weekend": 0.0, "hours_holiday": 0.0,
-                "hours_ot_t1": 0.0, "hours_ot_t2": 0.0,
-                "pay_base": 0.0, "pay_evening_bonus": 0.0, "pay_night_bonus": 0.0,
-                "pay_weekend_bonus": 0.0, "pay_holiday_bonus": 0.0,
-                "pay_overtime_t1": 0.0, "pay_overtime_t2": 0.0,
-                "travel_pay": 0.0, "pay_total_day": 0.0,
-                "pay_sick": pay
-            }])], ignore_index=True)
+    present = df["תאריך"].isin(list(pay_sick_map)).to_numpy(dtype=bool)
+    if present.any():
+        df.loc[present, [
+            "pay_base","pay_evening_bonus","pay_night_bonus","pay_weekend_bonus","pay_holiday_bonus",
+            "pay_overtime_t1","pay_overtime_t2","travel_pay","pay_total_day"
+        ]] = 0.0
+        df.loc[present, "pay_sick"] = df.loc[present, "תאריך"].map(pay_sick_map).to_numpy()
+
+    # ימי מחלה שאינם מופיעים בטבלה – שורות חדשות, מחוברות פעם אחת
+    existing_dates = set(df["תאריך"])
+    new_rows = [{
+        "תאריך": d, "סטטוס/הערות": "מחלה", "is_sick": True, "holiday": False,
+        "start": None, "end": None,
+        "minutes_total": 0, "minutes_evening": 0, "minutes_night": 0, "minutes_weekend": 0, "minutes_holiday": 0,
+        "worked_day": False,
+        "hours_total": 0.0, "hours_evening": 0.0, "hours_night": 0.0, "hours_weekend": 0.0, "hours_holiday": 0.0,
+        "hours_ot_t1": 0.0, "hours_ot_t2": 0.0,
+        "pay_base": 0.0, "pay_evening_bonus": 0.0, "pay_night_bonus": 0.0,
+        "pay_weekend_bonus": 0.0, "pay_holiday_bonus": 0.0,
+        "pay_overtime_t1": 0.0, "pay_overtime_t2": 0.0,
+        "travel_pay": 0.0, "pay_total_day": 0.0,
+        "pay_sick": pay
+    } for d, pay in pay_sick_map.items() if d not in existing_dates]
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
 
     df = df.sort_values("תאריך").reset_index(drop=True)
     return df
 
+# רכיבי השכר לעבודה (ללא נסיעות), בסדר החיבור לברוטו
+WAGE_COMPONENT_COLS = [
+    "pay_base", "pay_evening_bonus", "pay_night_bonus", "pay_weekend_bonus",
+    "pay_holiday_bonus", "pay_overtime_t1", "pay_overtime_t2", "pay_sick",
+]
+
 def summarize(df_paid: pd.DataFrame):
     hours_cols = ["hours_total","hours_evening","hours_night","hours_weekend","hours_holiday","hours_ot_t1","hours_ot_t2"]
     for c in hours_cols:
@@ -355,17 +333,19 @@ def summarize(df_paid: pd.DataFrame):
 
 
 # ===== מיסים וניכויים =====
-def income_tax_before_credit(monthly_taxable: float) -> float:
-    tax = 0.0
-    last = 0.0
-    for cap, rate in TAX_BRACKETS:
-        if monthly_taxable > cap:
-            tax += (cap - last) * rate
-            last = cap
-        else:
-            tax += (monthly_taxable - last) * rate
-            return max(0.0, round(tax, 2))
-    return max(0.0, round(tax, 2))
+def income_tax_before_credit(monthly_taxable):
+    """
+    מס לפני זיכוי: המס המצטבר עד המדרגה שבה נמצאת ההכנסה + החלק שבתוכה × שיעורה.
+    את המדרגה מוצאים בחיפוש בינארי (searchsorted) על התקרות.
+    מקבל סכום בודד (מחזיר np.float64, מעוגל כמו NumPy) או מערך סכומים (מחזיר מערך) – חישוב אחד לכולם.
+    """
+    x = np.asarray(monthly_taxable, dtype=float)
+    b = np.searchsorted(TAX_CAPS, x, side="left")
+    tax = TAX_PREFIX[b] + (x - TAX_LOWERS[b]) * TAX_RATES[b]
+    if tax.ndim == 0:
+        # עיגול של NumPy כמו במקור (הקלט מ-main הוא np.float64) – ונשאר np.float64 גם לזיכוי שאחריו
+        return max(0.0, np.round(tax[()], 2))
+    return np.maximum(0.0, np.round(tax, 2))
 
 def apply_credit_points(tax_before: float) -> float:
     relief = CREDIT_POINTS * CREDIT_POINT_VALUE
@@ -379,6 +359,46 @@ def ni_health(monthly_gross: float):
     return round(ni, 2), round(health, 2)
 
 
+# === תבנית הסיכום (summary.txt) – תוויות מרופדות ל-22 תווים ===
+SUMMARY_TEMPLATE = """\
+== סיכום שעות ==
+------------------------------------------------------------
+שעות סה"כ              : {hours_total:.2f} שעות
+שעות ערב               : {hours_evening:.2f} שעות
+שעות לילה              : {hours_night:.2f} שעות
+שעות סופ"ש             : {hours_weekend:.2f} שעות
+שעות חג                : {hours_holiday:.2f} שעות
+שעות נוספות 125%       : {hours_ot_t1:.2f} שעות
+שעות נוספות 150%       : {hours_ot_t2:.2f} שעות
+
+== סיכום רכיבי שכר (ברוטו) ==
+------------------------------------------------------------
+שכר בסיס               : {pay_base:,.2f} ₪
+תוספת ערב              : {pay_evening_bonus:,.2f} ₪
+תוספת לילה             : {pay_night_bonus:,.2f} ₪
+תוספת סופ"ש            : {pay_weekend_bonus:,.2f} ₪
+תוספת חג               : {pay_holiday_bonus:,.2f} ₪
+שעות נוספות 125%       : {pay_overtime_t1:,.2f} ₪
+שעות נוספות 150%       : {pay_overtime_t2:,.2f} ₪
+נסיעות                 : {travel_sum:,.2f} ₪
+מחלה                   : {pay_sick:,.2f} ₪
+סיבוס                  : {sibus:,.2f} ₪
+סה"כ ברוטו חייב        : {monthly_gross_taxable:,.2f} ₪
+
+== ניכויים ==
+------------------------------------------------------------
+פנסיה עובד             : {employee_pension:,.2f} ₪  ({pension_pct:.1f}% | בסיס: {pension_base_mode})
+ביטוח לאומי            : {ni:,.2f} ₪
+בריאות                 : {health:,.2f} ₪
+מס לפני זיכוי          : {tax_before:,.2f} ₪
+זיכוי (נק׳)            : {tax_credit:,.2f} ₪  ({credit_points} × {credit_point_value:.0f})
+מס לתשלום              : {tax_after:,.2f} ₪
+
+== נטו ==
+------------------------------------------------------------
+נטו לתשלום             : {net:,.2f} ₪"""
+
+
 def main():
     csv_path = Path("attendance_selected_columns.csv")
     if not csv_path.exists():
@@ -392,18 +412,10 @@ def main():
     # סיכומים
     sums_hours, sums_money, total_wage_only = summarize(paid)
 
-    # פירוק רכיבי שכר לעבודה (בסיס+בונוסים+שעות נוספות) + מחלה
-    wage_components = (
-        paid["pay_base"].sum()
-        + paid["pay_evening_bonus"].sum()
-        + paid["pay_night_bonus"].sum()
-        + paid["pay_weekend_bonus"].sum()
-        + paid["pay_holiday_bonus"].sum()
-        + paid["pay_overtime_t1"].sum()
-        + paid["pay_overtime_t2"].sum()
-        + paid["pay_sick"].sum()
-    )
-    travel_sum = paid["travel_pay"].sum()
+    # פירוק רכיבי שכר לעבודה (בסיס+בונוסים+שעות נוספות) + מחלה – מתוך סכומי העמודות של summarize
+    # (מעבר אחד על עמודות הכסף); חיבור לפי הסדר, כמו חיבור ה-.sum() הנפרדים
+    wage_components = sum(sums_money[c] for c in WAGE_COMPONENT_COLS)
+    travel_sum = sums_money["travel_pay"]
 
     # ברוטו חייב
     monthly_gross_taxable = wage_components + travel_sum + SIBUS_MONTHLY
@@ -432,57 +444,16 @@ def main():
     paid.to_csv(out_dir / "daily_breakdown.csv", index=False, encoding="utf-8-sig")
 
     # === בניית טקסט מסכם קריא ===
-    def fmt_money(v):
-        return f"{v:,.2f} ₪".replace(",", ",")
-    def fmt_hours(v):
-        return f"{v:.2f} שעות"
-    def pad(s, w=22):
-        return s.ljust(w)
-
-    sep = "-" * 60
-    summary_lines = []
-
-    summary_lines.append("== סיכום שעות ==")
-    summary_lines.append(sep)
-    summary_lines.append(pad("שעות סה\"כ")         + " : " + fmt_hours(sums_hours["hours_total"]))
-    summary_lines.append(pad("שעות ערב")           + " : " + fmt_hours(sums_hours["hours_evening"]))
-    summary_lines.append(pad("שעות לילה")          + " : " + fmt_hours(sums_hours["hours_night"]))
-    summary_lines.append(pad("שעות סופ\"ש")        + " : " + fmt_hours(sums_hours["hours_weekend"]))
-    summary_lines.append(pad("שעות חג")            + " : " + fmt_hours(sums_hours["hours_holiday"]))
-    summary_lines.append(pad("שעות נוספות 125%")   + " : " + fmt_hours(sums_hours["hours_ot_t1"]))
-    summary_lines.append(pad("שעות נוספות 150%")   + " : " + fmt_hours(sums_hours["hours_ot_t2"]))
-    summary_lines.append("")
-
-    summary_lines.append("== סיכום רכיבי שכר (ברוטו) ==")
-    summary_lines.append(sep)
-    summary_lines.append(pad("שכר בסיס")           + " : " + fmt_money(paid["pay_base"].sum()))
-    summary_lines.append(pad("תוספת ערב")          + " : " + fmt_money(paid["pay_evening_bonus"].sum()))
-    summary_lines.append(pad("תוספת לילה")         + " : " + fmt_money(paid["pay_night_bonus"].sum()))
-    summary_lines.append(pad("תוספת סופ\"ש")       + " : " + fmt_money(paid["pay_weekend_bonus"].sum()))
-    summary_lines.append(pad("תוספת חג")           + " : " + fmt_money(paid["pay_holiday_bonus"].sum()))
-    summary_lines.append(pad("שעות נוספות 125%")    + " : " + fmt_money(paid["pay_overtime_t1"].sum()))
-    summary_lines.append(pad("שעות נוספות 150%")    + " : " + fmt_money(paid["pay_overtime_t2"].sum()))
-    summary_lines.append(pad("נסיעות")              + " : " + fmt_money(travel_sum))
-    summary_lines.append(pad("מחלה")                + " : " + fmt_money(paid["pay_sick"].sum()))
-    summary_lines.append(pad("סיבוס")               + " : " + fmt_money(SIBUS_MONTHLY))
-    summary_lines.append(pad("סה\"כ ברוטו חייב")     + " : " + fmt_money(monthly_gross_taxable))
-    summary_lines.append("")
-
-    summary_lines.append("== ניכויים ==")
-    summary_lines.append(sep)
-    summary_lines.append(pad("פנסיה עובד")          + " : " + fmt_money(employee_pension) + f"  ({EMPLOYEE_PENSION_RATE*100:.1f}% | בסיס: {PENSION_BASE_MODE})")
-    summary_lines.append(pad("ביטוח לאומי")         + " : " + fmt_money(ni))
-    summary_lines.append(pad("בריאות")              + " : " + fmt_money(health))
-    summary_lines.append(pad("מס לפני זיכוי")       + " : " + fmt_money(tax_before))
-    summary_lines.append(pad("זיכוי (נק׳)")         + " : " + fmt_money(tax_before - tax_after) + f"  ({CREDIT_POINTS} × {CREDIT_POINT_VALUE:.0f})")
-    summary_lines.append(pad("מס לתשלום")           + " : " + fmt_money(tax_after))
-    summary_lines.append("")
-
-    summary_lines.append("== נטו ==")
-    summary_lines.append(sep)
-    summary_lines.append(pad("נטו לתשלום")          + " : " + fmt_money(net))
-
-    (out_dir / "summary.txt").write_text("\n".join(summary_lines), encoding="utf-8")
+    values = {c: sums_money[c] for c in WAGE_COMPONENT_COLS}
+    values.update(sums_hours)
+    values.update(
+        travel_sum=travel_sum, sibus=SIBUS_MONTHLY, monthly_gross_taxable=monthly_gross_taxable,
+        employee_pension=employee_pension, pension_pct=EMPLOYEE_PENSION_RATE * 100,
+        pension_base_mode=PENSION_BASE_MODE, ni=ni, health=health, tax_before=tax_before,
+        tax_credit=tax_before - tax_after, credit_points=CREDIT_POINTS,
+        credit_point_value=CREDIT_POINT_VALUE, tax_after=tax_after, net=net,
+    )
+    (out_dir / "summary.txt").write_text(SUMMARY_TEMPLATE.format_map(values), encoding="utf-8")
 
     # JSON מסכם
     result = {
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 סקריפט: פירוק טבלת נוכחות מקובץ PDF, תיקון עברית, ושמירת קבצי CSV
-מחייב התקנה של: pdfplumber, pandas
+מחייב התקנה של: pandas ו-pdfplumber (או PyMuPDF, לבחירה מפורשת עם --engine pymupdf)
 
 דוגמת שימוש (שורת פקודה):
 python pdf_attendance_to_csv.py --pdf "TimesheetAnalysisReport_202508.pdf_1755963802915.pdf" --outdir "./out"
@@ -14,18 +14,54 @@ python pdf_attendance_to_csv.py --pdf "TimesheetAnalysisReport_202508.pdf_175596
 """
 
 import argparse
+import hashlib
 from pathlib import Path
 import re
 import pandas as pd
 
+try:
+    import pymupdf as fitz  # PyMuPDF – זיהוי טבלאות ממומש ב-C (השם fitz הוצא משימוש בגרסאות חדשות)
+except Exception:
+    try:
+        import fitz
+    except Exception:
+        fitz = None
+
 try:
     import pdfplumber
 except Exception as e:
-    raise SystemExit("יש להתקין pdfplumber: pip install pdfplumber\nשגיאה: %s" % e)
+    pdfplumber = None
+    if fitz is None:
+        raise SystemExit("יש להתקין pdfplumber: pip install pdfplumber\nשגיאה: %s" % e)
+
+
+def _append_table(tables: list[pd.DataFrame], rows, page_no: int):
+    """הוספת טבלה (רשימת שורות) לרשימה, אלא אם היא ריקה/זעירה."""
+    df = pd.DataFrame(rows)
+    # התעלמות מטבלאות ריקות/זעירות
+    if df.dropna(how="all").shape[0] == 0 or df.shape[1] < 2:
+        return
+    # הוספת אינדיקציה לעמוד
+    df["__page"] = page_no
+    tables.append(df)
+
+
+def extract_tables_pymupdf(pdf_path: Path) -> list[pd.DataFrame]:
+    """חילוץ הטבלאות עם PyMuPDF (page.find_tables) – אותו סדר עמודות ואותה עברית הפוכה כמו ב-pdfplumber."""
+    tables: list[pd.DataFrame] = []
+    with fitz.open(pdf_path) as doc:
+        for i, page in enumerate(doc):
+            try:
+                page_tables = [t.extract() for t in page.find_tables().tables]
+            except Exception:
+                page_tables = []
+            for t in page_tables:
+                _append_table(tables, t, i + 1)
+    return tables
 
 
-def extract_tables_from_pdf(pdf_path: Path) -> list[pd.DataFrame]:
-    """חילוץ כל הטבלאות מכל העמודים ב-PDF (כרשימת DataFrame-ים)."""
+def extract_tables_pdfplumber(pdf_path: Path) -> list[pd.DataFrame]:
+    """חילוץ הטבלאות עם pdfplumber (page.extract_tables)."""
     tables: list[pd.DataFrame] = []
     with pdfplumber.open(pdf_path) as pdf:
         for i, page in enumerate(pdf.pages):
@@ -34,16 +70,25 @@ def extract_tables_from_pdf(pdf_path: Path) -> list[pd.DataFrame]:
             except Exception:
                 page_tables = []
             for t in page_tables:
-                df = pd.DataFrame(t)
-                # התעלמות מטבלאות ריקות/זעירות
-                if df.dropna(how="all").shape[0] == 0 or df.shape[1] < 2:
-                    continue
-                # הוספת אינדיקציה לעמוד
-                df["__page"] = i + 1
-                tables.append(df)
+                _append_table(tables, t, i + 1)
     return tables
 
 
+def extract_tables_from_pdf(pdf_path: Path, engine: str = "pdfplumber") -> list[pd.DataFrame]:
+    """
+    חילוץ כל הטבלאות מכל העמודים ב-PDF (כרשימת DataFrame-ים).
+    ברירת המחדל היא pdfplumber; engine="pymupdf" בבחירה מפורשת (נבדק מול content.pdf –
+    פלט זהה, כולל מיפוי העמודות 0..8 והיפוך העברית).
+    """
+    if engine == "pymupdf":
+        if fitz is None:
+            raise SystemExit("יש להתקין PyMuPDF: pip install pymupdf")
+        return extract_tables_pymupdf(pdf_path)
+    if pdfplumber is None:
+        raise SystemExit("יש להתקין pdfplumber: pip install pdfplumber")
+    return extract_tables_pdfplumber(pdf_path)
+
+
 def rename_columns_hebrew(df: pd.DataFrame) -> pd.DataFrame:
     """
     מיפוי כותרות אינדקס ספרתיות לכותרות קריאות בעברית בהתבסס על מבנה הדוח הספציפי.
@@ -72,28 +117,23 @@ def rename_columns_hebrew(df: pd.DataFrame) -> pd.DataFrame:
 HEB_ONLY = re.compile(r'^[\u0590-\u05FF\s]+$')
 
 
-def fix_hebrew_text(text):
-    """
-    תיקון טקסטים בעברית שהודפסו הפוך, על ידי היפוך המחרוזת
-    (מופעל רק אם המחרוזת מכילה עברית/רווחים בלבד).
-    """
-    if not isinstance(text, str):
-        return text
-    s = text.strip()
-    if not s:
-        return text
-    if HEB_ONLY.match(s):
-        return s[::-1]
-    return text
-
-
 def fix_hebrew_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
     הפיכת כל התאים בעברית (כולל שמות הימים וסטטוסים) כך שיופיעו בכיוון קריאה תקין.
     """
     fixed = df.copy()
     for col in fixed.columns:
-        fixed[col] = fixed[col].apply(fix_hebrew_text)
+        # עמודה שאינה object (למשל מספר העמוד) לא יכולה להכיל טקסט
+        if fixed[col].dtype != object:
+            continue
+        try:
+            stripped = fixed[col].str.strip()
+        except AttributeError:  # אין בעמודה מחרוזות בכלל
+            continue
+        # תא שכולו עברית/רווחים (אחרי strip) מוחלף בהיפוך שלו; שאר התאים נשארים כמות שהם
+        is_heb = stripped.str.match(HEB_ONLY, na=False)
+        if is_heb.any():
+            fixed[col] = fixed[col].mask(is_heb, stripped.str[::-1])
     return fixed
 
 
@@ -109,6 +149,31 @@ def select_requested_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df[cols].copy()
 
 
+def raw_table_cache_path(pdf_path: Path, outdir: Path, engine: str) -> Path:
+    """נתיב המטמון של הטבלה הגולמית: לפי גיבוב תוכן ה-PDF ומנוע החילוץ."""
+    digest = hashlib.blake2b(pdf_path.read_bytes(), digest_size=16).hexdigest()
+    return outdir / ".cache" / f"{digest}-{engine}.parquet"
+
+
+def load_cached_table(cache_path: Path):
+    """הטבלה הגולמית מהמטמון, או None אם אין (או שאין pyarrow לקריאת Parquet)."""
+    try:
+        df = pd.read_parquet(cache_path)
+    except Exception:
+        return None
+    # ב-Parquet שמות העמודות הם מחרוזות – מחזירים את האינדקסים הספרתיים המקוריים
+    df.columns = [int(c) if c.isdigit() else c for c in df.columns]
+    return df
+
+
+def save_cached_table(df: pd.DataFrame, cache_path: Path):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        df.rename(columns=str).to_parquet(cache_path, index=False)
+    except Exception as e:
+        print(f"אזהרה: המטמון לא נשמר ({e})")
+
+
 def save_csv(df: pd.DataFrame, out_path: Path):
     out_path.parent.mkdir(parents=True, exist_ok=True)
     df.to_csv(out_path, index=False, encoding='utf-8-sig')
@@ -118,6 +183,9 @@ def main():
     ap = argparse.ArgumentParser(description="חילוץ טבלת נוכחות מ-PDF ושמירה ל-CSV")
     ap.add_argument("--pdf", required=True, help="נתיב לקובץ ה-PDF של הדוח")
     ap.add_argument("--outdir", default=".", help="ספריית פלט ל-CSV")
+    ap.add_argument("--engine", choices=["pdfplumber", "pymupdf"], default="pdfplumber",
+                    help="מנוע חילוץ הטבלאות (ברירת מחדל: pdfplumber)")
+    ap.add_argument("--no-cache", action="store_true", help="חילוץ מחדש מה-PDF גם אם יש טבלה שמורה במטמון")
     args = ap.parse_args()
 
     pdf_path = Path(args.pdf)
@@ -126,13 +194,17 @@ def main():
     if not pdf_path.exists():
         raise SystemExit(f"לא נמצא קובץ PDF בנתיב: {pdf_path}")
 
-    # 1) חילוץ טבלאות
-    tables = extract_tables_from_pdf(pdf_path)
-    if not tables:
-        raise SystemExit("לא נמצאו טבלאות ב-PDF.")
-
-    # בדוח שלך יש טבלה מרכזית אחת, נבחר בראשונה
-    df_raw = tables[0].copy()
+    # 1) חילוץ טבלאות – בהרצה חוזרת על אותו PDF הטבלה הגולמית נטענת מהמטמון (Parquet)
+    cache_path = raw_table_cache_path(pdf_path, outdir, args.engine)
+    df_raw = None if args.no_cache else load_cached_table(cache_path)
+    if df_raw is None:
+        tables = extract_tables_from_pdf(pdf_path, args.engine)
+        if not tables:
+            raise SystemExit("לא נמצאו טבלאות ב-PDF.")
+
+        # בדוח שלך יש טבלה מרכזית אחת, נבחר בראשונה
+        df_raw = tables[0].copy()
+        save_cached_table(df_raw, cache_path)
 
     # 2) שמירת הטבלה הגולמית בדיוק כפי שחולצה
     save_csv(df_raw, outdir / "attendance_full_table.csv")